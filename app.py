@@ -2,14 +2,24 @@
 
 import streamlit as st
 import pandas as pd
-import altair as alt
+import numpy as np
 from datetime import datetime, timedelta, date, time
-from github import Github, Auth, GithubException
-import io
 import json
 import base64
 import uuid
 
+from bulk_import import mark_duplicates, normalize_rows, read_csv_rows, read_ics_rows
+from charts import (CHART_BUDGET_BYTES, ChartCache, agenda_days, calendar_spec, cost_pie_spec, daily_costs_spec, payload_bytes, scenario_spec,
+                    sensitivity_spec)
+from costs import CostTotals, balances, default_members, join_names, scenario_grid, sensitivity, settle
+from diagnostics import Metrics, Profiler, diagnostics_settings, log_report
+from ics_export import build_ics
+from planner import REGISTRY_FILE, get_journal_file, get_trip_files, parse_config, read_config, read_registry, read_trip, trip_members
+from scheduling import REGULY_KATEGORII, auto_plan
+from storage import ConflictError, blob_sha, create_buffered_storage, storage_settings
+from trip_data import (CSV_HEADER, JOURNAL_LIMIT, apply_ops, build_row_index, build_views, changes_layout, empty_frame, journal_lines,
+                       load_trip, make_row, merge_frames, op_add, op_delete, op_update, parse_data_csv, to_csv)
+
 # ==========================================
 # 🎨 PALETA KOLORÓW (RETRO DARK)
 # ==========================================
@@ -23,12 +33,16 @@ COLOR_FOOD = "#7c8c58"      # Olive Drab (Jedzenie)
 COLOR_PARTY = "#8c5e7c"     # Muted Plum (Impreza)
 COLOR_SPORT = "#e0c068"     # Muted Gold (Sport/Rekreacja)
 
+# Ta sama paleta dla modułu wykresów
+PALETA = {'bg': COLOR_BG, 'text': COLOR_TEXT, 'accent': COLOR_ACCENT, 'sec': COLOR_SEC,
+          'food': COLOR_FOOD, 'party': COLOR_PARTY, 'sport': COLOR_SPORT}
+
 # ==========================================
 # ⚙️ KONFIGURACJA PLIKÓW
 # ==========================================
-REGISTRY_FILE = "registry.json"
-DEFAULT_TRIP_ID = "default"
 SZEROKOSC_KOLUMNY_DZIEN = 100
+KALENDARZ_OKNO = 7  # widok desktopowy: tyle dni na jednej stronie kalendarza
+AGENDA_OKNO = 2  # widok mobilny: ile dni przed/po dzisiejszym pokazać
 
 st.set_page_config(page_title="Planer Wycieczki", layout="wide")
 
@@ -88,16 +102,26 @@ st.markdown(
 # ==========================================
 # 🔧 GITHUB & FILE SYSTEM 2.0
 # ==========================================
-def init_github():
+def read_secrets():
+    try: return st.secrets.to_dict()
+    except Exception: return {}
+
+@st.cache_resource(show_spinner=False)
+def connect_storage():
+    # Jeden obiekt na proces: bufor zmian jest wspólny dla wszystkich sesji
+    secrets = read_secrets()
+    return create_buffered_storage(storage_settings(secrets), secrets)
+
+@st.cache_resource(show_spinner=False)
+def diagnostics_metrics():
+    # Sumy czasów i zapytań ze wszystkich sesji - do pliku dla Prometheusa
+    return Metrics()
+
+def init_storage():
     try:
-        token = st.secrets["github"]["token"]
-        repo_name = st.secrets["github"]["repo_name"]
-        auth = Auth.Token(token)
-        g = Github(auth=auth) 
-        repo = g.get_repo(repo_name)
-        return repo
+        return connect_storage()
     except Exception as e:
-        st.error(f"Błąd połączenia z GitHub: {e}")
+        st.error(f"Błąd połączenia z bazą danych: {e}")
         return None
 
 def image_to_base64(image_path):
@@ -107,113 +131,247 @@ def image_to_base64(image_path):
     except FileNotFoundError: return None
 
 # --- OBSŁUGA REJESTRU WYPRAW ---
-def get_registry(repo):
+def get_registry(storage):
+    # Błąd odczytu (np. GitHub niedostępny) idzie wyżej - nowy rejestr tylko gdy pliku naprawdę nie ma
+    registry = read_registry(storage)
+    if registry is not None: return registry
+
     try:
-        contents = repo.get_contents(REGISTRY_FILE)
-        return json.loads(contents.decoded_content.decode("utf-8"))
-    except Exception:
-        try:
-            old_data = repo.get_contents("data.csv")
-            repo.update_file("default_data.csv", "Migracja", old_data.decoded_content, old_data.sha)
-            repo.delete_file("data.csv", "Cleanup", old_data.sha)
-            try:
-                old_conf = repo.get_contents("config.json")
-                repo.update_file("default_config.json", "Migracja", old_conf.decoded_content, old_conf.sha)
-                repo.delete_file("config.json", "Cleanup", old_conf.sha)
-            except: pass
+        old_data = storage.read("data.csv")
+        if old_data:
+            storage.write("default_data.csv", old_data.content, "Migracja")
+            storage.delete("data.csv", "Cleanup")
+            old_conf = storage.read("config.json")
+            if old_conf:
+                storage.write("default_config.json", old_conf.content, "Migracja")
+                storage.delete("config.json", "Cleanup")
             st.toast("Dokonano migracji bazy!", icon="📦")
-        except: pass
+    except Exception: pass
 
-        new_registry = {"current": "default", "trips": {"default": "Moja Pierwsza Wyprawa"}}
-        repo.create_file(REGISTRY_FILE, "Init Registry", json.dumps(new_registry, indent=4))
-        return new_registry
-
-def update_registry(repo, registry_data):
+    new_registry = {"current": "default", "trips": {"default": "Moja Pierwsza Wyprawa"}}
+    try:
+        # Tylko jeśli w międzyczasie nikt go nie utworzył - nigdy nie nadpisujemy istniejącego rejestru
+        storage.commit({REGISTRY_FILE: json.dumps(new_registry, indent=4)}, "Init Registry", base={REGISTRY_FILE: None})
+    except ConflictError:
+        return read_registry(storage)
+    return new_registry
+
+def merge_registry(base, mine, theirs):
+    # Na aktualny rejestr z bazy nakładamy tylko to, co ta sesja zmieniła względem wczytanej wersji
+    trips = dict(theirs.get("trips", {}))
+    for trip_id in base.get("trips", {}).keys() - mine.get("trips", {}).keys(): trips.pop(trip_id, None)
+    trips.update({k: v for k, v in mine.get("trips", {}).items() if base.get("trips", {}).get(k) != v})
+    current = mine.get("current") if mine.get("current") != base.get("current") else theirs.get("current", mine.get("current"))
+    return {**theirs, "current": current, "trips": trips}
+
+def update_registry(storage, registry_data):
+    # Zapis warunkowy po SHA rejestru (write_merged) - wyprawy dodane w innej sesji nie znikają
+    def build(remote):
+        theirs = json.loads(remote[REGISTRY_FILE]) if remote[REGISTRY_FILE] else {}
+        return {REGISTRY_FILE: json.dumps(merge_registry(registry_base, registry_data, theirs), indent=4)}
     try:
-        contents = repo.get_contents(REGISTRY_FILE)
-        repo.update_file(contents.path, "Update Registry", json.dumps(registry_data, indent=4), contents.sha)
+        storage.write_merged([REGISTRY_FILE], build, "Update Registry")
         return True
     except Exception as e:
         st.error(f"Błąd zapisu rejestru: {e}")
         return False
 
 # --- POBIERANIE DANYCH ---
-def get_trip_files(trip_id):
-    return f"{trip_id}_data.csv", f"{trip_id}_config.json"
+@st.cache_data(max_entries=32, show_spinner=False)
+def parse_data_cached(sha, _content):
+    # Klucz to SHA pliku - ta sama wersja danych jest parsowana raz na proces
+    return parse_data_csv(_content)
 
-def get_data(repo, filename):
+def get_data(storage, trip_id):
     try:
-        contents = repo.get_contents(filename)
-        df = pd.read_csv(io.StringIO(contents.decoded_content.decode("utf-8")))
-        if 'Start' in df.columns: df['Start'] = pd.to_datetime(df['Start'], errors='coerce')
-        if 'Koniec' in df.columns: df['Koniec'] = pd.to_datetime(df['Koniec'], errors='coerce')
-        if 'Koszt' not in df.columns: df['Koszt'] = 0.0
-        if 'Typ_Kosztu' not in df.columns: df['Typ_Kosztu'] = 'Indywidualny'
-        return df.fillna("")
+        df, migrated, journal_count = read_trip(storage, trip_id, parse=parse_data_cached)
+        if migrated is not None:
+            data_path = get_trip_files(trip_id)[0]
+            note_version(data_path, storage.write(data_path, to_csv(migrated), "Migracja: ID wierszy"))
+        return df, journal_count
     except Exception:
-        return pd.DataFrame(columns=['Tytuł', 'Kategoria', 'Czas (h)', 'Start', 'Koniec', 'Zaplanowane', 'Koszt', 'Typ_Kosztu'])
+        return empty_frame(), 0
 
-def get_config(repo, filename):
-    default_conf = {"trip_name": "Nowa Wyprawa", "start_date": "2026-06-01", "days": 7, "people": 1}
+def get_config(storage, trip_id):
+    try: return read_config(storage, trip_id)
+    except Exception: return parse_config(None)
+
+def update_config(storage, filename, base, mine):
+    # Zapis ustawień bez gubienia cudzych zmian: nadpisujemy tylko klucze zmienione w tej sesji
+    def build(remote):
+        theirs = json.loads(remote[filename]) if remote[filename] else {}
+        return {filename: json.dumps({**theirs, **{k: v for k, v in mine.items() if base.get(k) != v}}, indent=4)}
     try:
-        contents = repo.get_contents(filename)
-        config = json.loads(contents.decoded_content.decode("utf-8"))
-        config['start_date'] = datetime.strptime(config['start_date'], "%Y-%m-%d").date()
-        if 'trip_name' not in config: config['trip_name'] = default_conf['trip_name']
-        return config
-    except Exception:
-        default_conf['start_date'] = datetime.strptime(default_conf['start_date'], "%Y-%m-%d").date()
-        return default_conf
+        storage.write_merged([filename], build, "Update Config")
+        # Jeśli nikt inny nie ruszył ustawień, w bazie powstanie dokładnie ta treść
+        expected = build({filename: st.session_state.config_text})[filename]
+        st.session_state.config_text = expected
+        note_version(filename, blob_sha(expected))
+        return True
+    except Exception as e:
+        st.error(f"Błąd zapisu pliku {filename}: {e}")
+        return False
 
-def update_file(repo, filename, content_str, message="Update"):
+def update_file(storage, filename, content_str, message="Update"):
     try:
-        try:
-            contents = repo.get_contents(filename)
-            repo.update_file(contents.path, message, content_str, contents.sha)
-        except:
-            repo.create_file(filename, message, content_str)
+        storage.write(filename, content_str, message)
         return True
     except Exception as e:
         st.error(f"Błąd zapisu pliku {filename}: {e}")
         return False
 
-def delete_trip_files(repo, trip_id):
+def delete_trip_files(storage, trip_id):
     f_data, f_conf = get_trip_files(trip_id)
-    try: repo.delete_file(f_data, "Delete Data", repo.get_contents(f_data).sha)
-    except: pass
-    try: repo.delete_file(f_conf, "Delete Config", repo.get_contents(f_conf).sha)
-    except: pass
+    try: storage.delete(f_data, "Delete Data")
+    except Exception: pass
+    try: storage.delete(f_conf, "Delete Config")
+    except Exception: pass
+    try: storage.delete(get_journal_file(trip_id), "Delete Journal")
+    except Exception: pass
+
+# --- ZAPIS ZMIAN (DZIENNIK) ---
+def set_db(df, costs=None):
+    st.session_state.db = df
+    st.session_state.db_index = build_row_index(df)
+    # Pełne przeliczenie sum tylko przy wczytaniu; zmiany idą przyrostowo w save_changes
+    st.session_state.db_costs = costs if costs is not None else CostTotals.from_frame(df)
+    bump_version()
+
+def bump_version():
+    st.session_state.db_version = st.session_state.get('db_version', 0) + 1
+    if 'current_trip_id' in st.session_state: chart_cache().evict(st.session_state.current_trip_id)
+
+def chart_cache():
+    if 'chart_cache' not in st.session_state: st.session_state.chart_cache = ChartCache()
+    return st.session_state.chart_cache
+
+def chart_key(view):
+    return (st.session_state.current_trip_id, st.session_state.db_version,
+            st.session_state.config_days, st.session_state.config_start_date, view)
+
+def get_chart(view, build):
+    # Gotowy spec Vega-Lite; budowany ponownie tylko po zmianie danych lub parametrów widoku
+    return chart_cache().get(chart_key(view), build)
+
+def get_views():
+    # Partycje (plan / poczekalnia / koszty wspólne) liczone raz na wersję danych
+    cached = st.session_state.get('db_views')
+    if cached is None or cached[0] != st.session_state.db_version:
+        cached = (st.session_state.db_version, build_views(st.session_state.db))
+        st.session_state.db_views = cached
+    return cached[1]
+
+def row_by_id(row_id):
+    return st.session_state.db.iloc[st.session_state.db_index[row_id]]
+
+def find_row(row_id):
+    return row_by_id(row_id).to_dict() if row_id in st.session_state.db_index else None
+
+def note_version(path, sha):
+    # Wersja pliku, którą ta sesja już ma u siebie - gdy pojawi się w bazie (nasz zapis w tle), nie przeładowujemy
+    st.session_state.db_known.setdefault(path, set()).add(sha)
+
+def trip_changed():
+    # W bazie jest wersja, której sesja nie zna = zapis z innej sesji
+    known = st.session_state.get('db_known', {})
+    return any(storage.version(path) not in known.get(path, ()) for path in (data_file, journal_file, config_file))
+
+def load_trip_state():
+    # Znane wersje: ta z bazy i ta z kolejką zapisu (po jej wysłaniu baza będzie miała dokładnie tę treść)
+    views = {path: storage.read(path) for path in (data_file, journal_file, config_file)}
+    st.session_state.db_known = {path: {storage.version(path), f.sha if f else None} for path, f in views.items()}
+    st.session_state.journal_text = views[journal_file].content if views[journal_file] else ""
+    st.session_state.config_text = views[config_file].content if views[config_file] else None
+    df, st.session_state.journal_count = get_data(storage, st.session_state.current_trip_id)
+    st.session_state.db_base = df
+    set_db(df)
+    conf = get_config(storage, st.session_state.current_trip_id)
+    st.session_state.config_base = {**conf, 'start_date': conf['start_date'].strftime("%Y-%m-%d")}
+    st.session_state.config_trip_name = conf['trip_name']
+    st.session_state.config_start_date = conf['start_date']
+    st.session_state.config_days = conf['days']
+    st.session_state.config_people = conf['people']
+    st.session_state.config_members = trip_members(conf)
+
+def compact_journal(base, mine):
+    # Snapshot = trójstronne scalenie: wersja wczytana w sesji / sesja / aktualna baza z dziennikiem
+    def build(remote):
+        theirs = load_trip(remote[data_file], remote[journal_file])
+        merged, _ = merge_frames(base, mine, theirs)
+        return {data_file: to_csv(merged), journal_file: None}
+    return build
+
+def save_changes(ops, message="Update"):
+    # Zmiana trafia od razu do sesji, a do bazy idzie tylko jako dopisek w dzienniku.
+    # Co JOURNAL_LIMIT wpisów dziennik zwijamy do nowego snapshotu CSV.
+    costs = st.session_state.db_costs
+    costs.apply(ops, find_row)
+    updated = apply_ops(st.session_state.db, ops, st.session_state.db_index)
+    if changes_layout(ops): set_db(updated, costs)
+    else:
+        st.session_state.db = updated
+        bump_version()
+    # Bez czytania dziennika: dopisek trafia do kolejki, a wysyła go wątek zapisu w tle
+    try:
+        st.session_state.journal_count += len(ops)
+        if st.session_state.journal_count >= JOURNAL_LIMIT:
+            storage.write_merged([data_file, journal_file], compact_journal(st.session_state.db_base, st.session_state.db), "Kompaktowanie dziennika")
+            st.session_state.db_base = st.session_state.db
+            st.session_state.journal_count = 0
+            st.session_state.journal_text = ""
+            note_version(data_file, blob_sha(to_csv(st.session_state.db)))
+            note_version(journal_file, None)
+        else:
+            lines = journal_lines(ops)
+            storage.append(journal_file, lines, message)
+            st.session_state.journal_text += lines
+            note_version(journal_file, blob_sha(st.session_state.journal_text))
+        return True
+    except Exception as e:
+        st.error(f"Błąd zapisu zmian: {e}")
+        return False
 
 # ==========================================
 # 🚀 INICJALIZACJA
 # ==========================================
-repo = init_github()
-if repo:
-    registry = get_registry(repo)
-    remote_current_id = registry.get("current", "default")
+# Diagnostyka: włączona w [diagnostics] / PLANER_DIAGNOSTICS albo dla jednej sesji przez ?diag=1
+diag_settings = diagnostics_settings(read_secrets())
+prof = Profiler(enabled=diag_settings["enabled"] or st.query_params.get("diag") == "1")
+prof.watch_cache("wykresy", chart_cache())
+
+with prof.section("init / rejestr"):
+    storage = prof.wrap_storage(init_storage())
+    prof.watch_cache("odczyty GitHub", getattr(getattr(storage, "inner", None), "cache", None))
+    if storage:
+        try: registry = get_registry(storage)
+        except Exception as e:
+            st.error(f"Błąd odczytu rejestru wypraw: {e}")
+            st.stop()
+        registry_base = json.loads(json.dumps(registry))  # wersja z bazy - update_registry zapisuje tylko różnicę
+        remote_current_id = registry.get("current", "default")
     
-    if 'manual_switch_flag' in st.session_state and st.session_state.manual_switch_flag:
-        current_id = st.session_state.current_trip_id
-        del st.session_state.manual_switch_flag 
-    else:
-        current_id = remote_current_id
+        if 'manual_switch_flag' in st.session_state and st.session_state.manual_switch_flag:
+            current_id = st.session_state.current_trip_id
+            del st.session_state.manual_switch_flag 
+        else:
+            current_id = remote_current_id
 
-    data_file, config_file = get_trip_files(current_id)
+        data_file, config_file = get_trip_files(current_id)
+        journal_file = get_journal_file(current_id)
     
-    if 'current_trip_id' not in st.session_state or st.session_state.current_trip_id != current_id or 'db' not in st.session_state:
-        st.session_state.current_trip_id = current_id
-        st.session_state.db = get_data(repo, data_file)
-        conf = get_config(repo, config_file)
-        st.session_state.config_trip_name = conf['trip_name']
-        st.session_state.config_start_date = conf['start_date']
-        st.session_state.config_days = conf['days']
-        st.session_state.config_people = conf['people']
-else: st.stop()
+        if 'current_trip_id' not in st.session_state or st.session_state.current_trip_id != current_id or 'db_index' not in st.session_state:
+            st.session_state.current_trip_id = current_id
+            load_trip_state()
+        elif trip_changed():
+            # Ktoś inny zapisał od wczytania: dociągamy bazę razem z niewysłanymi zmianami z kolejki
+            load_trip_state()
+    else: st.stop()
 
 # ==========================================
 # 📂 DIALOG: MENADŻER ZAPISÓW
 # ==========================================
 @st.dialog("📂 Menadżer Zapisów")
+@prof.timed("dialog: 📂 Menadżer Zapisów")
 def save_manager_dialog():
     st.caption("Tutaj możesz przełączać się między różnymi wycieczkami.")
     trips_dict = registry.get("trips", {})
@@ -233,10 +391,10 @@ def save_manager_dialog():
         if found_id != st.session_state.current_trip_id:
             with st.spinner("Przełączam bazę danych..."):
                 registry['current'] = found_id
-                update_registry(repo, registry)
+                update_registry(storage, registry)
                 st.session_state.current_trip_id = found_id
                 st.session_state.manual_switch_flag = True
-                if 'db' in st.session_state: del st.session_state.db
+                if 'db_index' in st.session_state: del st.session_state.db_index
                 st.rerun()
 
     st.divider()
@@ -250,16 +408,16 @@ def save_manager_dialog():
                     new_id = str(uuid.uuid4())[:8]
                     registry['trips'][new_id] = new_trip_name
                     registry['current'] = new_id
-                    update_registry(repo, registry)
+                    update_registry(storage, registry)
                     
                     new_conf = {"trip_name": new_trip_name, "start_date": "2026-06-01", "days": 7, "people": 1}
                     new_f_data, new_f_conf = get_trip_files(new_id)
-                    update_file(repo, new_f_conf, json.dumps(new_conf, indent=4), "Init Config")
-                    update_file(repo, new_f_data, "Tytuł,Kategoria,Czas (h),Start,Koniec,Zaplanowane,Koszt,Typ_Kosztu\n", "Init Data")
+                    update_file(storage, new_f_conf, json.dumps(new_conf, indent=4), "Init Config")
+                    update_file(storage, new_f_data, CSV_HEADER, "Init Data")
                     
                     st.session_state.current_trip_id = new_id
                     st.session_state.manual_switch_flag = True
-                    if 'db' in st.session_state: del st.session_state.db
+                    if 'db_index' in st.session_state: del st.session_state.db_index
                     st.rerun()
     
     if len(trips_dict) > 1:
@@ -268,42 +426,108 @@ def save_manager_dialog():
             if st.button(f"Usuń trwale: {to_del}"):
                 del_id = [k for k, v in trips_dict.items() if v == to_del][0]
                 del registry['trips'][del_id]
-                update_registry(repo, registry)
-                delete_trip_files(repo, del_id)
+                update_registry(storage, registry)
+                delete_trip_files(storage, del_id)
                 st.success("Usunięto."); st.rerun()
 
 # ==========================================
 # 🗑️ DIALOG: ODPINANIE
 # ==========================================
 @st.dialog("🗑️ Odepnij z kalendarza")
+@prof.timed("dialog: 🗑️ Odepnij z kalendarza")
 def unpin_dialog():
     st.write("Wybierz wydarzenie, które chcesz zdjąć z planu (trafi z powrotem do Edytora).")
-    mask_zap = (st.session_state.db['Zaplanowane'].astype(str).str.upper() == 'TRUE') & (st.session_state.db['Typ_Kosztu'] == 'Indywidualny')
-    zaplanowane = st.session_state.db[mask_zap]
+    zaplanowane = get_views().planned
     
     if not zaplanowane.empty:
-        zaplanowane_sorted = zaplanowane.sort_values(by='Start')
-        opcje = zaplanowane_sorted.apply(lambda x: f"{x['Tytuł']} ({x['Start'].strftime('%d.%m %H:%M')})", axis=1).tolist()
-        wybrany_op = st.selectbox("Wybierz wydarzenie:", opcje)
+        etykiety = dict(zip(zaplanowane['ID'], zaplanowane['Tytuł'] + " (" + zaplanowane['Start'].dt.strftime('%d.%m %H:%M') + ")"))
+        wybrany_id = st.selectbox("Wybierz wydarzenie:", list(etykiety), format_func=etykiety.get)
         
-        if wybrany_op:
-            orig_tytul = zaplanowane_sorted.iloc[opcje.index(wybrany_op)]['Tytuł']
+        if wybrany_id:
+            orig_tytul = row_by_id(wybrany_id)['Tytuł']
             st.warning(f"Czy na pewno chcesz odpiąć: **{orig_tytul}**?")
             
             if st.button("Tak, odepnij", type="primary", use_container_width=True):
-                with st.spinner("Aktualizuję..."):
-                    idx = st.session_state.db[st.session_state.db['Tytuł'] == orig_tytul].index[0]
-                    st.session_state.db.at[idx, 'Zaplanowane'] = False
-                    st.session_state.db.at[idx, 'Start'] = None
-                    csv_buffer = io.StringIO(); st.session_state.db.to_csv(csv_buffer, index=False)
-                    update_file(repo, data_file, csv_buffer.getvalue())
-                    st.rerun()
+                save_changes([op_update(wybrany_id, Zaplanowane=False, Start=None)], "Odepnij")
+                st.rerun()
     else: st.info("Kalendarz jest pusty. Nie ma czego odpinać.")
 
+# ==========================================
+# 🪄 DIALOG: AUTO-PLAN
+# ==========================================
+@st.dialog("🪄 Auto-plan", width="large")
+@prof.timed("dialog: 🪄 Auto-plan")
+def autoplan_dialog():
+    st.write("Rozłóż pozycje z Poczekalni na wolne godziny wyjazdu. Nic się nie zapisze, dopóki nie zatwierdzisz podglądu.")
+    wake = st.slider("Godziny aktywności:", 0, 24, (8, 22))
+    reguly_df = pd.DataFrame([{'Kategoria': k, 'Od': od, 'Do': do} for k, zakresy in REGULY_KATEGORII.items() for od, do in zakresy])
+    with st.expander("Reguły kategorii (dozwolone godziny, w granicach godzin aktywności)"):
+        reguly_df = st.data_editor(reguly_df, num_rows="dynamic", hide_index=True, use_container_width=True, column_config={
+            "Od": st.column_config.NumberColumn(min_value=0, max_value=24, step=1),
+            "Do": st.column_config.NumberColumn(min_value=0, max_value=24, step=1),
+        })
+    reguly = {}
+    for kat, od, do in reguly_df.dropna().itertuples(index=False):
+        reguly.setdefault(kat, []).append((int(od), int(do)))
+
+    if st.button("Przelicz propozycję", use_container_width=True):
+        views = get_views()
+        st.session_state.autoplan_proposal = auto_plan(
+            views.backlog, views.planned, st.session_state.config_start_date, st.session_state.config_days, wake, reguly
+        )
+
+    if 'autoplan_proposal' in st.session_state:
+        propozycja, nieumieszczone = st.session_state.autoplan_proposal
+        podglad = propozycja.assign(
+            Dzień=propozycja['Start'].dt.strftime('%d.%m'), Od=propozycja['Start'].dt.strftime('%H:%M'), Do=propozycja['Koniec'].dt.strftime('%H:%M')
+        )
+        st.dataframe(podglad[['Dzień', 'Od', 'Do', 'Tytuł', 'Kategoria']], use_container_width=True, hide_index=True, height=300)
+        if not nieumieszczone.empty:
+            st.warning(f"Nie zmieściło się ({len(nieumieszczone)}): {', '.join(nieumieszczone['Tytuł'].head(10))}")
+        if not propozycja.empty and st.button(f"✅ Zapisz plan ({len(propozycja)})", type="primary", use_container_width=True):
+            save_changes([
+                op_update(row_id, Start=start.to_pydatetime(), Koniec=koniec.to_pydatetime(), Zaplanowane=True)
+                for row_id, start, koniec in zip(propozycja['ID'], propozycja['Start'], propozycja['Koniec'])
+            ], "Auto-plan")
+            del st.session_state.autoplan_proposal
+            st.rerun()
+
+@st.dialog("📥 Import aktywności", width="large")
+@prof.timed("dialog: 📥 Import aktywności")
+def import_dialog():
+    st.write("Wgraj plik CSV (np. eksport z arkusza) albo kalendarz .ics. Wszystko zapisze się jednym zapisem po zatwierdzeniu podglądu.")
+    plik = st.file_uploader("Plik CSV / ICS", type=["csv", "ics", "txt"])
+    wklejone = st.text_area("...albo wklej CSV (pierwsza linia to nagłówki, np. Tytuł;Kategoria;Czas;Koszt;Start)", height=120)
+
+    if plik is not None or wklejone.strip():
+        zrodlo = plik.getvalue() if plik is not None else wklejone
+        if plik is not None and plik.name.lower().endswith(".ics"): wiersze = read_ics_rows(zrodlo)
+        else: wiersze = read_csv_rows(zrodlo)
+        nowe, bledy = normalize_rows(wiersze)
+        if bledy:
+            with st.expander(f"⚠️ Pominięte wiersze ({len(bledy)})"):
+                st.write("\n".join(f"- {b}" for b in bledy[:200]))
+        if nowe.empty:
+            st.info("Brak poprawnych wierszy do importu.")
+            return
+        nowe = mark_duplicates(nowe, st.session_state.db['Tytuł'])
+        podglad = nowe.assign(Importuj=~nowe['Duplikat'])
+        st.caption(f"Poprawnych: {len(nowe)}, w tym duplikatów tytułów: {int(nowe['Duplikat'].sum())} (domyślnie odznaczone).")
+        podglad = st.data_editor(
+            podglad[['Importuj', 'Duplikat', 'Tytuł', 'Kategoria', 'Czas (h)', 'Koszt', 'Start', 'Typ_Kosztu']],
+            hide_index=True, use_container_width=True, height=300, key="import_podglad",
+            disabled=['Duplikat', 'Tytuł', 'Kategoria', 'Czas (h)', 'Koszt', 'Start', 'Typ_Kosztu'],
+        )
+        wybrane = nowe[podglad['Importuj'].to_numpy()].drop(columns=['Duplikat'])
+        if not wybrane.empty and st.button(f"✅ Importuj ({len(wybrane)})", type="primary", use_container_width=True):
+            save_changes([op_add({k: (None if pd.isna(v) else v) for k, v in row.items()}) for row in wybrane.to_dict('records')], "Import aktywności")
+            st.rerun()
+
 # ==========================================
 # ⚙️ DIALOG KONFIGURACJI
 # ==========================================
 @st.dialog("⚙️ Konfiguracja Wyjazdu")
+@prof.timed("dialog: ⚙️ Konfiguracja Wyjazdu")
 def settings_dialog():
     st.write("Edytujesz: " + st.session_state.config_trip_name)
     new_name = st.text_input("Nazwa Wyprawy:", value=st.session_state.config_trip_name)
@@ -312,19 +536,25 @@ def settings_dialog():
     with c2: new_days = st.number_input("Dni:", min_value=1, max_value=60, value=st.session_state.config_days)
     st.divider()
     new_people = st.number_input("Uczestnicy:", min_value=1, value=st.session_state.config_people)
+    imiona = st.text_input("Imiona (po przecinku):", value=", ".join(st.session_state.config_members),
+                           help="Potrzebne do rozliczenia kto komu oddaje. Brakujące imiona uzupełnimy jako 'Osoba N'.")
+    new_members = [n.strip() for n in imiona.split(",") if n.strip()][:new_people]
+    new_members += [n for n in default_members(new_people) if n not in new_members][:new_people - len(new_members)]
     
     if st.button("Zapisz zmiany", type="primary"):
         with st.spinner("Zapisuję..."):
-            new_conf = {"trip_name": new_name, "start_date": new_date, "days": new_days, "people": new_people}
+            new_conf = {"trip_name": new_name, "start_date": new_date, "days": new_days, "people": new_people, "members": new_members}
             registry['trips'][st.session_state.current_trip_id] = new_name
-            update_registry(repo, registry)
+            update_registry(storage, registry)
             _, f_conf = get_trip_files(st.session_state.current_trip_id)
             save_c = new_conf.copy(); save_c['start_date'] = save_c['start_date'].strftime("%Y-%m-%d")
-            update_file(repo, f_conf, json.dumps(save_c, indent=4))
+            update_config(storage, f_conf, st.session_state.config_base, save_c)
+            st.session_state.config_base = save_c
             st.session_state.config_trip_name = new_name
             st.session_state.config_start_date = new_date
             st.session_state.config_days = new_days
             st.session_state.config_people = new_people
+            st.session_state.config_members = new_members
             st.rerun()
 
 # ==========================================
@@ -350,7 +580,7 @@ with col_title:
     html += f"<h1 style='color: {COLOR_TEXT}; margin: 0; font-size: 2.8rem; line-height: 1.1; letter-spacing: -1px; text-transform: uppercase; font-weight: 700;'>{title_html}</h1>"
     html += f"<p style='margin: 5px 0 0 0; font-size: 1.1rem; color: {COLOR_TEXT}; opacity: 0.9; font-weight: 400; letter-spacing: 3px; text-transform: uppercase;'>PLANNER WYJAZDOWY</p>"
     html += f"<div style='height: 4px; width: 60px; background-color: {COLOR_ACCENT}; margin: 20px 0 15px 0; border-radius: 2px;'></div>"
-    html += f"<p style='margin: 0; font-size: 0.9rem; color: {COLOR_TEXT}; opacity: 0.7; font-family: monospace; display: flex; align-items: center; gap: 8px;'>{icon_github} Baza danych: GitHub Repository</p>"
+    html += f"<p style='margin: 0; font-size: 0.9rem; color: {COLOR_TEXT}; opacity: 0.7; font-family: monospace; display: flex; align-items: center; gap: 8px;'>{icon_github} Baza danych: {storage.label}</p>"
     html += "</div>"
     html += f"<div style='flex: 0 0 auto; margin-left: 20px;'>{icon_logotype}</div>"
     html += "</div>"
@@ -363,6 +593,26 @@ with col_settings:
     if st.button("⚙️", use_container_width=True, help="Ustawienia"):
         settings_dialog()
 
+# --- OCZEKUJĄCE ZMIANY (ZAPIS W TLE) ---
+stan_zapisu = storage.status()
+if stan_zapisu["queued"] or stan_zapisu["in_flight"] or stan_zapisu["failed"] or stan_zapisu["rejected"]:
+    col_pending, col_sync = st.columns([6, 1])
+    with col_pending:
+        kolejka = stan_zapisu["queued"] + stan_zapisu["in_flight"]
+        if stan_zapisu["failed"]:
+            ponowienie = datetime.fromtimestamp(stan_zapisu["retry_at"]).strftime('%H:%M:%S') if stan_zapisu["retry_at"] else "-"
+            st.warning(f"Nie udało się zsynchronizować ({len(kolejka)} plików czeka, próba {stan_zapisu['failures']}, ponowienie o {ponowienie}): {stan_zapisu['failed']}")
+        elif stan_zapisu["deferred_until"]: st.warning(f"⏳ Limit API GitHuba prawie wyczerpany - {len(kolejka)} plików poczeka z zapisem do {datetime.fromtimestamp(stan_zapisu['deferred_until']).strftime('%H:%M')}")
+        elif stan_zapisu["rejected"]: st.warning(f"⚠️ Zmiana odrzucona - ktoś inny zapisał w międzyczasie: {', '.join(stan_zapisu['rejected'])}")
+        elif stan_zapisu["in_flight"]: st.caption(f"📤 Wysyłanie… ({', '.join(stan_zapisu['in_flight'])})" + (f" + w kolejce: {len(stan_zapisu['queued'])}" if stan_zapisu["queued"] else ""))
+        else: st.caption(f"⏳ Niezapisane zmiany: {len(kolejka)} ({', '.join(kolejka)}) - zapis nastąpi automatycznie w tle")
+    with col_sync:
+        if st.button("🔄 Synchronizuj", use_container_width=True):
+            with st.spinner("Synchronizuję..."):
+                if storage.flush(force=True): st.rerun()
+elif getattr(storage.inner, "stale", False):
+    st.caption("📴 GitHub chwilowo niedostępny - pokazuję ostatnią pobraną wersję danych.")
+
 # ==========================================
 # 📊 HELPERY
 # ==========================================
@@ -383,6 +633,67 @@ def przygotuj_dane_do_siatki(df):
             })
     return pd.DataFrame(grid_data)
 
+def sprawdz_kolizje(start_dt, czas_h, key):
+    # Ostrzega o nakładaniu się z planem i podpowiada najbliższy wolny termin.
+    # Zwraca (czy_wolno_zapisać, wolny_termin)
+    busy = get_views().busy
+    konflikty = busy.overlaps(start_dt, start_dt + timedelta(hours=czas_h))
+    if not konflikty: return True, None
+    nazwy = ", ".join(row_by_id(i)['Tytuł'] for i in konflikty[:3])
+    if len(konflikty) > 3: nazwy += f" (+{len(konflikty) - 3})"
+    st.warning(f"⚠️ Koliduje z: **{nazwy}**")
+    okno_start = datetime.combine(st.session_state.config_start_date, time(0, 0))
+    okno_koniec = okno_start + timedelta(days=st.session_state.config_days)
+    wolny = busy.nearest_free(start_dt, timedelta(hours=czas_h), okno_start, okno_koniec)
+    if wolny: st.caption(f"🕒 Najbliższy wolny termin: **{wolny.strftime('%d.%m %H:%M')}**")
+    else: st.caption("Brak wolnego terminu o tej długości w czasie wyjazdu.")
+    return st.checkbox("Zapisz mimo kolizji", key=f"{key}_mimo_kolizji"), wolny
+
+def wrzuc_na_plan(row_id, start_dt, czas_h):
+    save_changes([op_update(
+        row_id, Start=start_dt, Koniec=start_dt + timedelta(hours=czas_h), Zaplanowane=True
+    )], "Wrzuć na plan")
+    st.success("Zapisano!"); st.rerun()
+
+def wybor_platnika(key):
+    # (płatnik, uczestnicy) do nowego kosztu; uczestnicy "" = wszyscy
+    members = st.session_state.config_members
+    c_kto, c_za_kogo = st.columns(2)
+    with c_kto: platnik = st.selectbox("Kto zapłacił", members, key=f"platnik_{key}")
+    with c_za_kogo: wybrani = st.multiselect("Za kogo", members, default=members, key=f"uczestnicy_{key}")
+    return platnik, "" if set(wybrani) == set(members) or not wybrani else join_names(wybrani)
+
+def edytor_platnikow(df_wspolne):
+    members = st.session_state.config_members
+    edited = st.data_editor(
+        df_wspolne[['Tytuł', 'Koszt', 'Płatnik', 'Uczestnicy']], hide_index=True, use_container_width=True, key="edytor_platnikow",
+        disabled=['Tytuł', 'Koszt'],
+        column_config={
+            "Płatnik": st.column_config.SelectboxColumn("Kto zapłacił", options=members),
+            "Uczestnicy": st.column_config.TextColumn("Za kogo", help="Imiona rozdzielone ';' - puste = wszyscy"),
+            "Koszt": st.column_config.NumberColumn(format="%.2f zł"),
+        })
+    changed = (edited['Płatnik'].fillna("") != df_wspolne['Płatnik']) | (edited['Uczestnicy'].fillna("") != df_wspolne['Uczestnicy'])
+    if changed.any() and st.button(f"💾 Zapisz zmiany ({int(changed.sum())})", use_container_width=True):
+        ops = [op_update(row_id, **{'Płatnik': p or "", 'Uczestnicy': u or ""})
+               for row_id, p, u in zip(df_wspolne.loc[changed, 'ID'], edited.loc[changed, 'Płatnik'], edited.loc[changed, 'Uczestnicy'])]
+        save_changes(ops, "Płatnicy kosztów")
+        st.rerun()
+
+def dodaj_trase(tytul, start_dt, czas_h):
+    nowa_trasa = make_row(**{
+        'Tytuł': tytul, 
+        'Kategoria': 'Trasa', 
+        'Czas (h)': float(czas_h), 
+        'Start': start_dt, 
+        'Koniec': start_dt + timedelta(hours=float(czas_h)), 
+        'Zaplanowane': True,
+        'Koszt': 0.0, 
+        'Typ_Kosztu': 'Indywidualny' 
+    })
+    save_changes([op_add(nowa_trasa)], "Dodaj trasę")
+    st.success(f"Dodano trasę: {tytul}"); st.rerun()
+
 def generuj_tlo_widoku(start_date, num_days):
     tlo_data = []
     for d in range(num_days):
@@ -394,12 +705,127 @@ def generuj_tlo_widoku(start_date, num_days):
     return pd.DataFrame(tlo_data)
 
 # ==========================================
-# 📑 GŁÓWNE ZAKŁADKI
+# 📝 EDYTOR
 # ==========================================
-tab_edytor, tab_kalendarz, tab_podsumowanie = st.tabs(["📝 Edytor", "📅 Kalendarz", "💰 Podsumowanie"])
+# Każdy panel to osobny fragment: jego widgety przeliczają tylko jego samego.
+@st.fragment
+def panel_aktywnosci():
+    views = get_views()
+    col_a, col_b = st.columns([1, 1.5]) 
+    with col_a:
+        with st.container(border=True):
+            st.subheader("➕ Dodaj aktywność")
+            with st.form("dodawanie_form", clear_on_submit=True):
+                tytul = st.text_input("Tytuł")
+                kat = st.selectbox("Kategoria", ["Atrakcja", "Jedzenie", "Impreza", "Sport/Rekreacja"]) 
+                c1, c2 = st.columns(2)
+                with c1: czas = st.number_input("Czas (h)", min_value=1.0, step=1.0, value=1.0) 
+                with c2: koszt = st.number_input("Koszt (PLN)", min_value=0.0, step=10.0, value=0.0)
+                submit = st.form_submit_button("Zapisz", type="primary", use_container_width=True)
+
+        if submit and tytul:
+            nowy = make_row(**{
+                'Tytuł': tytul, 'Kategoria': kat, 'Czas (h)': float(czas), 
+                'Start': None, 'Koniec': None, 'Zaplanowane': False,
+                'Koszt': float(koszt), 'Typ_Kosztu': 'Indywidualny' 
+            })
+            save_changes([op_add(nowy)], "Dodaj aktywność")
+            st.success(f"Dodano '{tytul}'!"); st.rerun()
+
+        if st.button("📥 Import CSV / ICS", use_container_width=True, help="Dodaj wiele aktywności naraz z pliku"):
+            import_dialog()
+
+    with col_b:
+        with st.container(border=True):
+            st.subheader("📦 Giełda pomysłów (Poczekalnia)")
+            do_pokazania = views.backlog
+            
+            if not do_pokazania.empty:
+                event = st.dataframe(
+                    do_pokazania[['Tytuł', 'Kategoria', 'Czas (h)', 'Koszt']], 
+                    use_container_width=True, on_select="rerun", selection_mode="multi-row", hide_index=True
+                )
+                if event.selection.rows:
+                    if st.button("🗑️ Usuń zaznaczone trwale", type="primary", use_container_width=True):
+                        ids = do_pokazania.iloc[event.selection.rows]['ID']
+                        save_changes([op_delete(i) for i in ids], "Usuń aktywności")
+                        st.rerun()
+                if st.button("🪄 Auto-plan", use_container_width=True, help="Rozłóż poczekalnię na wolne godziny"):
+                    st.session_state.pop('autoplan_proposal', None)
+                    autoplan_dialog()
+            else: st.info("Brak nieprzypisanych elementów. Dodaj coś po lewej!")
+
+@st.fragment
+def panel_koszty_wspolne():
+    views = get_views()
+    col_form, col_table = st.columns([1, 1.5])
+    with col_form:
+        with st.container(border=True):
+            st.subheader("➕ Dodaj koszt wspólny")
+            typ_kosztu_input = st.selectbox("Co dodajesz?", ["Wydatek (Nocleg/Inne)", "Paliwo (Trasa)"])
+            st.divider()
+
+            if typ_kosztu_input == "Wydatek (Nocleg/Inne)":
+                with st.form("form_wspolne_general", clear_on_submit=True):
+                    nazwa = st.text_input("Nazwa (np. Willa, Winiety)")
+                    c_kat_w, c_koszt_w = st.columns(2)
+                    with c_kat_w: kategoria_wsp = st.selectbox("Kategoria", ["Nocleg", "Wynajem Busa", "Winiety", "Inne"])
+                    with c_koszt_w: koszt_calosc = st.number_input("Koszt (PLN)", min_value=0.0, step=100.0)
+                    platnik, uczestnicy = wybor_platnika("wsp")
+                    
+                    submitted = st.form_submit_button("Dodaj Wydatek", type="primary", use_container_width=True)
+                    if submitted and nazwa and koszt_calosc > 0:
+                        nowy = make_row(**{
+                            'Tytuł': nazwa, 'Kategoria': kategoria_wsp, 'Czas (h)': 0, 
+                            'Start': None, 'Koniec': None, 'Zaplanowane': False, 
+                            'Koszt': float(koszt_calosc), 'Typ_Kosztu': 'Wspólny',
+                            'Płatnik': platnik, 'Uczestnicy': uczestnicy
+                        })
+                        save_changes([op_add(nowy)], "Dodaj wydatek")
+                        st.success(f"Dodano {nazwa}!"); st.rerun()
+
+            else: 
+                auto_nazwa = st.text_input("Samochód", value="Auto 1")
+                dystans = st.number_input("Dystans (km)", min_value=0, value=100, step=10)
+                spalanie = st.slider("Spalanie (l/100km)", 1.0, 20.0, 8.0, step=0.1)
+                cena_paliwa = st.slider("Cena paliwa (PLN/l)", 3.0, 10.0, 6.50, step=0.01)
+                koszt_trasy = (dystans / 100) * spalanie * cena_paliwa
+                st.markdown(f"**Wyliczony koszt:** :red[{koszt_trasy:.2f} PLN]")
+                platnik, uczestnicy = wybor_platnika("paliwo")
+                
+                if st.button("Dodaj Paliwo", type="primary", use_container_width=True):
+                    tytul_auta = f"Paliwo: {auto_nazwa} ({dystans}km)"
+                    nowy = make_row(**{
+                        'Tytuł': tytul_auta, 'Kategoria': 'Trasa', 'Czas (h)': 0, 
+                        'Start': None, 'Koniec': None, 'Zaplanowane': False, 
+                        'Koszt': float(koszt_trasy), 'Typ_Kosztu': 'Paliwo',
+                        'Płatnik': platnik, 'Uczestnicy': uczestnicy
+                    })
+                    save_changes([op_add(nowy)], "Dodaj paliwo")
+                    st.success(f"Dodano {auto_nazwa}!"); st.rerun()
+
+    with col_table:
+        with st.container(border=True):
+            st.subheader("📋 Baza kosztów wspólnych")
+            df_wspolne = views.shared
+            if not df_wspolne.empty:
+                cols_to_show = ['Tytuł', 'Kategoria', 'Koszt', 'Płatnik']
+                event = st.dataframe(
+                    df_wspolne[cols_to_show], 
+                    use_container_width=True, hide_index=True, selection_mode="multi-row", on_select="rerun", 
+                    column_config={"Koszt": st.column_config.NumberColumn("Koszt Całkowity", format="%.2f zł")}
+                )
+                if event.selection.rows:
+                    if st.button("🗑️ Usuń wybrane koszty", type="primary", use_container_width=True):
+                        ids = df_wspolne.iloc[event.selection.rows]['ID']
+                        save_changes([op_delete(i) for i in ids], "Usuń koszty")
+                        st.rerun()
+                with st.expander("✏️ Kto płacił i za kogo"):
+                    edytor_platnikow(df_wspolne)
+            else: st.info("Brak kosztów wspólnych.")
 
 # --- TAB 1: EDYTOR (SCALONY + SUWAKI PALIWA) ---
-with tab_edytor:
+def render_edytor():
     editor_mode = st.radio(
         "Tryb edycji:", 
         ["🏃 Aktywności (Indywidualne)", "💸 Koszty Wspólne / Paliwo"], 
@@ -408,129 +834,15 @@ with tab_edytor:
     )
     st.write("")
 
-    if editor_mode == "🏃 Aktywności (Indywidualne)":
-        col_a, col_b = st.columns([1, 1.5]) 
-        with col_a:
-            with st.container(border=True):
-                st.subheader("➕ Dodaj aktywność")
-                with st.form("dodawanie_form", clear_on_submit=True):
-                    tytul = st.text_input("Tytuł")
-                    kat = st.selectbox("Kategoria", ["Atrakcja", "Jedzenie", "Impreza", "Sport/Rekreacja"]) 
-                    c1, c2 = st.columns(2)
-                    with c1: czas = st.number_input("Czas (h)", min_value=1.0, step=1.0, value=1.0) 
-                    with c2: koszt = st.number_input("Koszt (PLN)", min_value=0.0, step=10.0, value=0.0)
-                    submit = st.form_submit_button("Zapisz", type="primary", use_container_width=True)
-
-            if submit and tytul:
-                with st.spinner("Zapisuję..."):
-                    nowy = pd.DataFrame([{
-                        'Tytuł': tytul, 'Kategoria': kat, 'Czas (h)': float(czas), 
-                        'Start': None, 'Koniec': None, 'Zaplanowane': False,
-                        'Koszt': float(koszt), 'Typ_Kosztu': 'Indywidualny' 
-                    }])
-                    updated_df = pd.concat([st.session_state.db, nowy], ignore_index=True)
-                    csv_buffer = io.StringIO(); updated_df.to_csv(csv_buffer, index=False)
-                    update_file(repo, data_file, csv_buffer.getvalue())
-                    st.session_state.db = updated_df
-                    st.success(f"Dodano '{tytul}'!"); st.rerun()
-
-        with col_b:
-            with st.container(border=True):
-                st.subheader("📦 Giełda pomysłów (Poczekalnia)")
-                mask_niezaplanowane = (st.session_state.db['Zaplanowane'].astype(str).str.upper() != 'TRUE') & \
-                                      (st.session_state.db['Typ_Kosztu'] == 'Indywidualny')
-                do_pokazania = st.session_state.db[mask_niezaplanowane]
-                
-                if not do_pokazania.empty:
-                    event = st.dataframe(
-                        do_pokazania[['Tytuł', 'Kategoria', 'Czas (h)', 'Koszt']], 
-                        use_container_width=True, on_select="rerun", selection_mode="multi-row", hide_index=True
-                    )
-                    if event.selection.rows:
-                        if st.button("🗑️ Usuń zaznaczone trwale", type="primary", use_container_width=True):
-                            with st.spinner("Usuwam..."):
-                                indeksy = do_pokazania.iloc[event.selection.rows].index
-                                updated_df = st.session_state.db.drop(indeksy).reset_index(drop=True)
-                                csv_buffer = io.StringIO(); updated_df.to_csv(csv_buffer, index=False)
-                                update_file(repo, data_file, csv_buffer.getvalue())
-                                st.session_state.db = updated_df
-                                st.rerun()
-                else: st.info("Brak nieprzypisanych elementów. Dodaj coś po lewej!")
-
-    else:
-        col_form, col_table = st.columns([1, 1.5])
-        with col_form:
-            with st.container(border=True):
-                st.subheader("➕ Dodaj koszt wspólny")
-                typ_kosztu_input = st.selectbox("Co dodajesz?", ["Wydatek (Nocleg/Inne)", "Paliwo (Trasa)"])
-                st.divider()
-
-                if typ_kosztu_input == "Wydatek (Nocleg/Inne)":
-                    with st.form("form_wspolne_general", clear_on_submit=True):
-                        nazwa = st.text_input("Nazwa (np. Willa, Winiety)")
-                        c_kat_w, c_koszt_w = st.columns(2)
-                        with c_kat_w: kategoria_wsp = st.selectbox("Kategoria", ["Nocleg", "Wynajem Busa", "Winiety", "Inne"])
-                        with c_koszt_w: koszt_calosc = st.number_input("Koszt (PLN)", min_value=0.0, step=100.0)
-                        
-                        submitted = st.form_submit_button("Dodaj Wydatek", type="primary", use_container_width=True)
-                        if submitted and nazwa and koszt_calosc > 0:
-                            nowy = pd.DataFrame([{
-                                'Tytuł': nazwa, 'Kategoria': kategoria_wsp, 'Czas (h)': 0, 
-                                'Start': None, 'Koniec': None, 'Zaplanowane': False, 
-                                'Koszt': float(koszt_calosc), 'Typ_Kosztu': 'Wspólny'
-                            }])
-                            updated_df = pd.concat([st.session_state.db, nowy], ignore_index=True)
-                            csv_buffer = io.StringIO(); updated_df.to_csv(csv_buffer, index=False)
-                            update_file(repo, data_file, csv_buffer.getvalue())
-                            st.session_state.db = updated_df
-                            st.success(f"Dodano {nazwa}!"); st.rerun()
-
-                else: 
-                    auto_nazwa = st.text_input("Samochód", value="Auto 1")
-                    dystans = st.number_input("Dystans (km)", min_value=0, value=100, step=10)
-                    spalanie = st.slider("Spalanie (l/100km)", 1.0, 20.0, 8.0, step=0.1)
-                    cena_paliwa = st.slider("Cena paliwa (PLN/l)", 3.0, 10.0, 6.50, step=0.01)
-                    koszt_trasy = (dystans / 100) * spalanie * cena_paliwa
-                    st.markdown(f"**Wyliczony koszt:** :red[{koszt_trasy:.2f} PLN]")
-                    
-                    if st.button("Dodaj Paliwo", type="primary", use_container_width=True):
-                        tytul_auta = f"Paliwo: {auto_nazwa} ({dystans}km)"
-                        nowy = pd.DataFrame([{
-                            'Tytuł': tytul_auta, 'Kategoria': 'Trasa', 'Czas (h)': 0, 
-                            'Start': None, 'Koniec': None, 'Zaplanowane': False, 
-                            'Koszt': float(koszt_trasy), 'Typ_Kosztu': 'Paliwo'
-                        }])
-                        updated_df = pd.concat([st.session_state.db, nowy], ignore_index=True)
-                        csv_buffer = io.StringIO(); updated_df.to_csv(csv_buffer, index=False)
-                        update_file(repo, data_file, csv_buffer.getvalue())
-                        st.session_state.db = updated_df
-                        st.success(f"Dodano {auto_nazwa}!"); st.rerun()
-
-        with col_table:
-            with st.container(border=True):
-                st.subheader("📋 Baza kosztów wspólnych")
-                mask_wspolne = st.session_state.db['Typ_Kosztu'].isin(['Wspólny', 'Paliwo'])
-                df_wspolne = st.session_state.db[mask_wspolne]
-                if not df_wspolne.empty:
-                    cols_to_show = ['Tytuł', 'Kategoria', 'Koszt']
-                    event = st.dataframe(
-                        df_wspolne[cols_to_show], 
-                        use_container_width=True, hide_index=True, selection_mode="multi-row", on_select="rerun", 
-                        column_config={"Koszt": st.column_config.NumberColumn("Koszt Całkowity", format="%.2f zł")}
-                    )
-                    if event.selection.rows:
-                        if st.button("🗑️ Usuń wybrane koszty", type="primary", use_container_width=True):
-                             with st.spinner("Usuwam..."):
-                                indeksy = df_wspolne.iloc[event.selection.rows].index
-                                updated_df = st.session_state.db.drop(indeksy).reset_index(drop=True)
-                                csv_buffer = io.StringIO(); updated_df.to_csv(csv_buffer, index=False)
-                                update_file(repo, data_file, csv_buffer.getvalue())
-                                st.session_state.db = updated_df
-                                st.rerun()
-                else: st.info("Brak kosztów wspólnych.")
+    if editor_mode == "🏃 Aktywności (Indywidualne)": panel_aktywnosci()
+    else: panel_koszty_wspolne()
 
-# --- TAB 2: KALENDARZ (HYBRID) ---
-with tab_kalendarz:
+# ==========================================
+# 📅 KALENDARZ
+# ==========================================
+@st.fragment
+def panel_widok_kalendarza():
+    views = get_views()
     # GÓRNA BELKA (TOGGLE + PRZYCISK ODPINANIA)
     col_switch, col_gap, col_btn = st.columns([2, 5, 2])
     
@@ -544,92 +856,42 @@ with tab_kalendarz:
     # LOGIKA KALENDARZA
     current_start_date = st.session_state.config_start_date
     current_days = st.session_state.config_days
-    mask_zap = (st.session_state.db['Zaplanowane'].astype(str).str.upper() == 'TRUE') & (st.session_state.db['Typ_Kosztu'] == 'Indywidualny')
-    df_events = st.session_state.db[mask_zap].copy()
-    if not df_events.empty:
-        df_events['Start'] = pd.to_datetime(df_events['Start'])
-        df_events = df_events.sort_values(by='Start')
         
     # --- EKSPORT ICS ---
-    def create_ics_file(df):
-        ics_content = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//ZwariowanaPrzygoda//PL", "CALSCALE:GREGORIAN", "METHOD:PUBLISH"]
-        mask = (df['Zaplanowane'].astype(str).str.upper() == 'TRUE') & (df['Typ_Kosztu'] == 'Indywidualny')
-        events = df[mask]
-        for _, row in events.iterrows():
-            if pd.isna(row['Start']) or row['Start'] == "": continue
-            start_dt = row['Start'].strftime('%Y%m%dT%H%M%S')
-            end_dt = (row['Start'] + timedelta(hours=float(row['Czas (h)']))).strftime('%Y%m%dT%H%M%S')
-            try: koszt_opis = f"Koszt: {float(row['Koszt']):.0f} PLN"
-            except: koszt_opis = ""
-            opis = f"{row['Kategoria']} \\n{koszt_opis}"
-            ics_content.append("BEGIN:VEVENT")
-            ics_content.append(f"SUMMARY:{row['Tytuł']}")
-            ics_content.append(f"DTSTART:{start_dt}")
-            ics_content.append(f"DTEND:{end_dt}")
-            ics_content.append(f"DESCRIPTION:{opis}")
-            ics_content.append(f"STATUS:CONFIRMED")
-            ics_content.append("END:VEVENT")
-        ics_content.append("END:VCALENDAR")
-        return "\n".join(ics_content)
-
-    if not df_events.empty:
-        ics_data = create_ics_file(st.session_state.db)
+    if not views.planned.empty:
+        # Plik powstaje dopiero po kliknięciu (w osobnym wątku), raz na wersję danych
+        cache, key, events = chart_cache(), chart_key("ics"), views.planned
         safe_name = st.session_state.config_trip_name.replace(" ", "_").lower()
-        st.download_button("📅 Pobierz do Kalendarza", data=ics_data, file_name=f"{safe_name}.ics", mime="text/calendar", use_container_width=True)
+        st.download_button("📅 Pobierz do Kalendarza", data=lambda: cache.get(key, lambda: build_ics(events)),
+                           file_name=f"{safe_name}.ics", mime="text/calendar", use_container_width=True)
         st.divider()
 
     # --- WIDOK MOBILNY (LISTA) ---
     if mobile_mode:
-        if df_events.empty: st.info("Nic jeszcze nie zaplanowano.")
+        if views.planned.empty: st.info("Nic jeszcze nie zaplanowano.")
         else:
-            df_events['Date_Only'] = df_events['Start'].dt.date
-            for day in sorted(df_events['Date_Only'].unique()):
-                day_map = {'Monday': 'Poniedziałek', 'Tuesday': 'Wtorek', 'Wednesday': 'Środa', 'Thursday': 'Czwartek', 'Friday': 'Piątek', 'Saturday': 'Sobota', 'Sunday': 'Niedziela'}
-                day_name = day.strftime('%A'); day_pl = day_map.get(day_name, day_name)
-                st.markdown(f"#### 🗓️ {day.strftime('%d.%m')} • {day_pl}")
-                daily_items = df_events[df_events['Date_Only'] == day]
-                for _, row in daily_items.iterrows():
-                    start_time = row['Start'].strftime('%H:%M'); end_time = (row['Start'] + timedelta(hours=float(row['Czas (h)']))).strftime('%H:%M')
-                    duration = int(row['Czas (h)']); title = row['Tytuł']; cat = row['Kategoria']
-                    try: cost_val = float(row['Koszt'])
-                    except: cost_val = 0.0
-                    cost_badge = f"<span style='float:right; font-weight:bold; background-color:rgba(255,255,255,0.2); padding: 2px 6px; border-radius:4px;'>{cost_val:.0f} zł</span>" if cost_val > 0 else ""
-                    
-                    if cat == "Atrakcja": bg_color = COLOR_ACCENT; text_color = "#faf9dd"
-                    elif cat == "Trasa": bg_color = COLOR_SEC; text_color = "#ffffff"
-                    elif cat == "Jedzenie": bg_color = COLOR_FOOD; text_color = "#ffffff"
-                    elif cat == "Impreza": bg_color = COLOR_PARTY; text_color = "#ffffff"
-                    elif cat == "Sport/Rekreacja": bg_color = COLOR_SPORT; text_color = "#ffffff"
-                    else: bg_color = "#444444"; text_color = "#dddddd"
-
-                    card_html = ""
-                    card_html += f"<div style='background-color: {bg_color}; color: {text_color}; padding: 15px; border-radius: 12px; margin-bottom: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.15); border-left: 6px solid rgba(0,0,0,0.2);'>"
-                    card_html += f"<div style='font-size: 0.9rem; opacity: 0.9; margin-bottom: 4px; display: flow-root;'><span>⏱️ {start_time} - {end_time} ({duration}h)</span>{cost_badge}</div>"
-                    card_html += f"<div style='font-size: 1.2rem; font-weight: 700; line-height: 1.2; margin-bottom: 4px;'>{title}</div>"
-                    card_html += f"<div style='font-size: 0.75rem; opacity: 0.7; text-transform: uppercase; letter-spacing: 1px;'>{cat}</div>"
-                    card_html += "</div>"
-                    st.markdown(card_html, unsafe_allow_html=True)
-                st.write("")
+            # Jeden blok HTML na dzień, tylko dla dni z wybranego okna
+            agenda = get_chart("agenda", lambda: agenda_days(views.planned, PALETA))
+            dni = list(agenda)
+            dzis = date.today()
+            if dni[0] <= dzis <= dni[-1]:
+                # W trakcie wyjazdu: dziś ± AGENDA_OKNO dni
+                okno = [d for d in dni if abs((d - dzis).days) <= AGENDA_OKNO] or dni[:1]
+            else:
+                okno = dni[:2 * AGENDA_OKNO + 1]
+            if len(dni) > 1:
+                od, do = st.select_slider("📆 Dni", options=dni, value=(okno[0], okno[-1]),
+                                          format_func=lambda d: d.strftime('%d.%m'))
+            else: od, do = dni[0], dni[0]
+            for day in dni:
+                if od <= day <= do: st.markdown(agenda[day], unsafe_allow_html=True)
     
 # --- WIDOK DESKTOPOWY (PIONOWY KALENDARZ - FIX PÓŁNOCY) ---
     else:
-        # 1. Generujemy listę WSZYSTKICH dni wyjazdu
-        all_dates = [current_start_date + timedelta(days=i) for i in range(current_days)]
-        all_days_labels = [d.strftime('%d.%m %A') for d in all_dates]
-        
-        # 2. Pobieramy dane
-        mask = (st.session_state.db['Zaplanowane'].astype(str).str.upper() == 'TRUE') & \
-               (st.session_state.db['Typ_Kosztu'] == 'Indywidualny')
-        df_raw = st.session_state.db[mask].copy()
-
-        # Paleta kolorów
-        domain = ["Atrakcja", "Trasa", "Jedzenie", "Impreza", "Sport/Rekreacja"]
-        range_colors = [COLOR_ACCENT, COLOR_SEC, COLOR_FOOD, COLOR_PARTY, COLOR_SPORT]
-
         st.markdown(
             """
             <style>
-            [data-testid="stAltairChart"] {
+            [data-testid="stVegaLiteChart"] {
                 overflow-x: auto !important;
                 padding-bottom: 20px;
             }
@@ -638,193 +900,111 @@ with tab_kalendarz:
             unsafe_allow_html=True
         )
 
-        calc_width = max(len(all_days_labels) * 120, 600)
-
-        # --- LOGIKA CIĘCIA PRZEZ PÓŁNOC (FIX) ---
-        chart_rows = []
-        if not df_raw.empty:
-            df_raw['Start'] = pd.to_datetime(df_raw['Start'])
-            df_raw['Koniec'] = pd.to_datetime(df_raw['Koniec'])
-            
-            for _, row in df_raw.iterrows():
-                s = row['Start']
-                e = row['Koniec']
-                
-                # Jeśli wydarzenie kończy się w innym dniu niż zaczyna
-                while s.date() < e.date():
-                    # Tworzymy segment do końca bieżącego dnia (23:59:59)
-                    end_of_day = datetime.combine(s.date(), time(23, 59, 59))
-                    
-                    segment = row.copy()
-                    segment['Start'] = s
-                    segment['Koniec'] = end_of_day
-                    chart_rows.append(segment)
-                    
-                    # Przesuwamy start na początek następnego dnia (00:00:00)
-                    s = datetime.combine(s.date() + timedelta(days=1), time(0, 0, 0))
-                
-                # Dodajemy ostatni segment (lub jedyny, jeśli nie przechodziło przez północ)
-                last_segment = row.copy()
-                last_segment['Start'] = s
-                last_segment['Koniec'] = e
-                chart_rows.append(last_segment)
-                
-            df_chart = pd.DataFrame(chart_rows)
-            # Generujemy etykietę dnia PO pocięciu
-            df_chart['Day_Label'] = df_chart['Start'].dt.strftime('%d.%m %A')
-        else:
-            df_chart = pd.DataFrame()
-
-        # Baza wykresu
-        base_chart = alt.Chart(df_chart if not df_chart.empty else pd.DataFrame({'Day_Label': all_days_labels}))
-
-        # 3. Rysujemy Paski
-        if not df_chart.empty:
-            bars = base_chart.mark_bar(
-                cornerRadius=4,
-                width=60 
-            ).encode(
-                x=alt.X('Day_Label:N', 
-                        title=None, 
-                        scale=alt.Scale(domain=all_days_labels, paddingInner=0.05), 
-                        axis=alt.Axis(
-                            labelColor=COLOR_TEXT, 
-                            labelFontSize=13, 
-                            labelFontWeight="bold", 
-                            labelAngle=0, 
-                            orient='top', 
-                            domainColor=COLOR_BG, 
-                            tickColor=COLOR_BG
-                        )
-                ),
-                y=alt.Y('hoursminutes(Start):T', 
-                        title=None,
-                        scale=alt.Scale(reverse=True), 
-                        axis=alt.Axis(
-                            format='%H:%M', 
-                            labelColor=COLOR_TEXT, 
-                            grid=True, 
-                            gridColor="#444444", 
-                            gridOpacity=0.3,
-                            domain=False,
-                            tickColor=COLOR_BG
-                        )
-                ),
-                y2='hoursminutes(Koniec):T',
-                color=alt.Color('Kategoria', scale=alt.Scale(domain=domain, range=range_colors), legend=None),
-                tooltip=['Tytuł', 'Kategoria', 'Start', 'Koniec', 'Koszt']
-            )
-
-            text = bars.mark_text(
-                align='center', baseline='middle', dy=-10,
-                color='white', fontWeight='bold', fontSize=10, limit=55
-            ).encode(text='Tytuł')
-            
-            text_time = bars.mark_text(
-                align='center', baseline='middle', dy=5,
-                color='white', opacity=0.8, fontSize=9
-            ).encode(text=alt.Text('hoursminutes(Start):T', format='%H:%M'))
+        # Długie wyjazdy: stronicowanie po KALENDARZ_OKNO dni, do wykresu idzie tylko wybrane okno
+        okno_start, okno_dni = current_start_date, current_days
+        if current_days > KALENDARZ_OKNO:
+            strony = list(range(0, current_days, KALENDARZ_OKNO))
+            dzis = (date.today() - current_start_date).days
+            domyslna = dzis // KALENDARZ_OKNO if 0 <= dzis < current_days else 0
+            def opis_strony(od):
+                do = min(od + KALENDARZ_OKNO, current_days) - 1
+                return f"{(current_start_date + timedelta(days=od)).strftime('%d.%m')} – {(current_start_date + timedelta(days=do)).strftime('%d.%m')}"
+            od = st.selectbox("🗓️ Tydzień", options=strony, index=domyslna, format_func=opis_strony)
+            okno_start, okno_dni = current_start_date + timedelta(days=od), min(KALENDARZ_OKNO, current_days - od)
+
+        # Spec budowany raz na wersję danych i okno (pasy + tytuły + godziny, z cięciem przez północ);
+        # rozmiar mierzony przy budowie i trzymany w cache razem ze specem
+        def zbuduj_kalendarz():
+            spec = calendar_spec(views.planned, okno_start, okno_dni, PALETA)
+            return spec, payload_bytes(spec) > CHART_BUDGET_BYTES
+        spec, ponad_budzet = get_chart(("kalendarz", okno_start, okno_dni), zbuduj_kalendarz)
+        st.vega_lite_chart(spec=spec, use_container_width=False)
+        if ponad_budzet:
+            st.caption("📦 Duży plan - kalendarz może wczytywać się wolniej. Na telefonie wygodniejszy będzie 📱 Widok Mobilny.")
+
+# 1. PRZYBORNIK (LEWO)
+@st.fragment
+def panel_przybornik():
+    views = get_views()
+    current_start_date = st.session_state.config_start_date
+    current_days = st.session_state.config_days
+    with st.container(border=True):
+        st.subheader("📌 Przybornik")
+        c1, c2, c3 = st.columns(3)
+        filtry = []
+        if c1.checkbox("Atrakcja", value=True): filtry.append("Atrakcja")
+        if c1.checkbox("Trasa", value=True): filtry.append("Trasa")
+        if c2.checkbox("Jedzenie", value=True): filtry.append("Jedzenie")
+        if c2.checkbox("Impreza", value=True): filtry.append("Impreza")
+        if c3.checkbox("Sport", value=True): filtry.append("Sport/Rekreacja")
+        
+        niezaplanowane = views.backlog
+        if not niezaplanowane.empty:
+            filtrowane_df = niezaplanowane[niezaplanowane['Kategoria'].isin(filtry)]
+            if not filtrowane_df.empty:
+                tytuly = dict(zip(filtrowane_df['ID'], filtrowane_df['Tytuł']))
+                wybrany = st.selectbox("Wybierz element:", list(tytuly), format_func=tytuly.get)
+                info = row_by_id(wybrany)
+                st.caption(f"Czas: **{int(float(info['Czas (h)']))}h** | Koszt: **{info.get('Koszt', 0)} PLN**")
+                cd, ch = st.columns(2)
+                with cd: wybrana_data = st.date_input("Dzień:", value=current_start_date, min_value=current_start_date, max_value=current_start_date + timedelta(days=current_days))
+                with ch: wybrana_godzina = st.selectbox("Start:", list(range(24)), format_func=lambda x: f"{x:02d}:00", index=10)
+                start_dt = datetime.combine(wybrana_data, time(wybrana_godzina, 0))
+                mozna, wolny = sprawdz_kolizje(start_dt, float(info['Czas (h)']), "przybornik")
+                if st.button("⬅️ WRZUĆ NA PLAN", type="primary", use_container_width=True, disabled=not mozna):
+                    wrzuc_na_plan(wybrany, start_dt, float(info['Czas (h)']))
+                if wolny and st.button(f"🕒 Wrzuć na {wolny.strftime('%d.%m %H:%M')}", use_container_width=True):
+                    wrzuc_na_plan(wybrany, wolny, float(info['Czas (h)']))
+            else: st.warning("Brak elementów w wybranych kategoriach.")
+        else: st.success("Pusto!")
+
+# 2. SZYBKA TRASA (PRAWO)
+@st.fragment
+def panel_trasa():
+    current_start_date = st.session_state.config_start_date
+    current_days = st.session_state.config_days
+    with st.container(border=True):
+        st.subheader("🚗 Dodaj Trasę")
+        
+        r_tytul = st.text_input("Tytuł trasy (np. Dojazd do Włoch)")
+        
+        c_r_data, c_r_godz = st.columns(2)
+        with c_r_data: r_data = st.date_input("Kiedy:", value=current_start_date, min_value=current_start_date, max_value=current_start_date + timedelta(days=current_days), key="route_date")
+        with c_r_godz: r_godz = st.selectbox("O której:", list(range(24)), format_func=lambda x: f"{x:02d}:00", index=8, key="route_hour")
+        
+        r_czas = st.number_input("Czas trwania (h):", min_value=1.0, step=0.5, value=2.0)
+        r_start = datetime.combine(r_data, time(r_godz, 0))
+        r_mozna, r_wolny = sprawdz_kolizje(r_start, float(r_czas), "trasa")
+        
+        if st.button("Dodaj trasę na mapę", type="primary", use_container_width=True, disabled=not r_mozna):
+            if r_tytul: dodaj_trase(r_tytul, r_start, r_czas)
+            else:
+                st.error("Wpisz tytuł trasy!")
+        if r_wolny and st.button(f"🕒 Dodaj na {r_wolny.strftime('%d.%m %H:%M')}", use_container_width=True):
+            if r_tytul: dodaj_trase(r_tytul, r_wolny, r_czas)
+            else: st.error("Wpisz tytuł trasy!")
 
-            final_chart = (bars + text + text_time)
-        else:
-            final_chart = alt.Chart(pd.DataFrame({'Day_Label': all_days_labels})).mark_rect().encode(
-                x=alt.X('Day_Label:N', scale=alt.Scale(domain=all_days_labels, paddingInner=0.05), axis=alt.Axis(labelColor=COLOR_TEXT, orient='top'))
-            )
-
-        # Finalna konfiguracja
-        final_chart = final_chart.properties(
-            height=800, 
-            width=calc_width,
-            background=COLOR_BG
-        ).configure_view(
-            stroke=COLOR_BG,
-            strokeWidth=0
-        )
+# --- TAB 2: KALENDARZ (HYBRID) ---
+def render_kalendarz():
+    panel_widok_kalendarza()
 
-        st.altair_chart(final_chart, use_container_width=False)
-    
     # --- DOLNA SEKCJA (PRZYBORNIK + NOWA SZYBKA TRASA) ---
     col_toolbox, col_route = st.columns(2)
+    with col_toolbox: panel_przybornik()
+    with col_route: panel_trasa()
 
-    # 1. PRZYBORNIK (LEWO)
-    with col_toolbox:
-        with st.container(border=True):
-            st.subheader("📌 Przybornik")
-            c1, c2, c3 = st.columns(3)
-            filtry = []
-            if c1.checkbox("Atrakcja", value=True): filtry.append("Atrakcja")
-            if c1.checkbox("Trasa", value=True): filtry.append("Trasa")
-            if c2.checkbox("Jedzenie", value=True): filtry.append("Jedzenie")
-            if c2.checkbox("Impreza", value=True): filtry.append("Impreza")
-            if c3.checkbox("Sport", value=True): filtry.append("Sport/Rekreacja")
-            
-            mask_przyb = (st.session_state.db['Zaplanowane'].astype(str).str.upper() != 'TRUE') & (st.session_state.db['Typ_Kosztu'] == 'Indywidualny')
-            niezaplanowane = st.session_state.db[mask_przyb]
-            if not niezaplanowane.empty:
-                filtrowane_df = niezaplanowane[niezaplanowane['Kategoria'].isin(filtry)]
-                if not filtrowane_df.empty:
-                    opcje = filtrowane_df['Tytuł'].tolist()
-                    wybrany = st.selectbox("Wybierz element:", opcje)
-                    info = filtrowane_df[filtrowane_df['Tytuł'] == wybrany].iloc[0]
-                    st.caption(f"Czas: **{int(float(info['Czas (h)']))}h** | Koszt: **{info.get('Koszt', 0)} PLN**")
-                    cd, ch = st.columns(2)
-                    with cd: wybrana_data = st.date_input("Dzień:", value=current_start_date, min_value=current_start_date, max_value=current_start_date + timedelta(days=current_days))
-                    with ch: wybrana_godzina = st.selectbox("Start:", list(range(24)), format_func=lambda x: f"{x:02d}:00", index=10)
-                    if st.button("⬅️ WRZUĆ NA PLAN", type="primary", use_container_width=True):
-                        with st.spinner("Aktualizuję..."):
-                            start_dt = datetime.combine(wybrana_data, time(wybrana_godzina, 0))
-                            idx = st.session_state.db[st.session_state.db['Tytuł'] == wybrany].index[0]
-                            st.session_state.db.at[idx, 'Start'] = start_dt
-                            st.session_state.db.at[idx, 'Koniec'] = start_dt + timedelta(hours=float(info['Czas (h)']))
-                            st.session_state.db.at[idx, 'Zaplanowane'] = True
-                            csv_buffer = io.StringIO(); st.session_state.db.to_csv(csv_buffer, index=False)
-                            update_file(repo, data_file, csv_buffer.getvalue())
-                            st.success("Zapisano!"); st.rerun()
-                else: st.warning("Brak elementów w wybranych kategoriach.")
-            else: st.success("Pusto!")
-
-    # 2. SZYBKA TRASA (PRAWO)
-    with col_route:
-        with st.container(border=True):
-            st.subheader("🚗 Dodaj Trasę")
-            
-            r_tytul = st.text_input("Tytuł trasy (np. Dojazd do Włoch)")
-            
-            c_r_data, c_r_godz = st.columns(2)
-            with c_r_data: r_data = st.date_input("Kiedy:", value=current_start_date, min_value=current_start_date, max_value=current_start_date + timedelta(days=current_days), key="route_date")
-            with c_r_godz: r_godz = st.selectbox("O której:", list(range(24)), format_func=lambda x: f"{x:02d}:00", index=8, key="route_hour")
-            
-            r_czas = st.number_input("Czas trwania (h):", min_value=1.0, step=0.5, value=2.0)
-            
-            if st.button("Dodaj trasę na mapę", type="primary", use_container_width=True):
-                if r_tytul:
-                    with st.spinner("Dodaję trasę..."):
-                        start_dt = datetime.combine(r_data, time(r_godz, 0))
-                        nowa_trasa = pd.DataFrame([{
-                            'Tytuł': r_tytul, 
-                            'Kategoria': 'Trasa', 
-                            'Czas (h)': float(r_czas), 
-                            'Start': start_dt, 
-                            'Koniec': start_dt + timedelta(hours=float(r_czas)), 
-                            'Zaplanowane': True,
-                            'Koszt': 0.0, 
-                            'Typ_Kosztu': 'Indywidualny' 
-                        }])
-                        updated_df = pd.concat([st.session_state.db, nowa_trasa], ignore_index=True)
-                        csv_buffer = io.StringIO(); updated_df.to_csv(csv_buffer, index=False)
-                        update_file(repo, data_file, csv_buffer.getvalue())
-                        st.session_state.db = updated_df
-                        st.success(f"Dodano trasę: {r_tytul}"); st.rerun()
-                else:
-                    st.error("Wpisz tytuł trasy!")
+# ==========================================
+# 💰 PODSUMOWANIE
+# ==========================================
 # --- TAB 4: PODSUMOWANIE ---
-with tab_podsumowanie:
+@st.fragment
+def panel_podsumowanie():
+    views = get_views()
     with st.container(border=True):
         st.subheader("Podsumowanie Wyjazdu")
-        mask_A = (st.session_state.db['Zaplanowane'].astype(str).str.upper() == 'TRUE') & (st.session_state.db['Typ_Kosztu'] == 'Indywidualny')
-        df_A = st.session_state.db[mask_A].copy(); df_A['Koszt'] = pd.to_numeric(df_A['Koszt'], errors='coerce').fillna(0); sum_A = df_A['Koszt'].sum()
-        mask_B = st.session_state.db['Typ_Kosztu'].isin(['Wspólny', 'Paliwo'])
-        df_B = st.session_state.db[mask_B].copy(); df_B['Koszt'] = pd.to_numeric(df_B['Koszt'], errors='coerce').fillna(0); sum_B_total = df_B['Koszt'].sum()
+        costs = st.session_state.db_costs
+        df_A = views.planned; sum_A = costs.individual
+        sum_B_total = costs.shared
         liczba_osob = st.session_state.config_people; sum_B_per_person = sum_B_total / liczba_osob; grand_total = sum_A + sum_B_per_person
 
         kpi1, kpi2, kpi3 = st.columns(3)
@@ -840,40 +1020,9 @@ with tab_podsumowanie:
             st.markdown("#### Struktura kosztów")
             
             # --- PIE CHART (FIX KOLORÓW) ---
-            pie_data = [{'Kategoria': 'Atrakcje', 'Wartość': sum_A}]
-            
-            if not df_B.empty:
-                grouped_B = df_B.groupby('Kategoria')['Koszt'].sum().reset_index()
-                for _, row in grouped_B.iterrows(): 
-                    pie_data.append({'Kategoria': row['Kategoria'], 'Wartość': row['Koszt'] / liczba_osob})
-            
-            df_pie = pd.DataFrame(pie_data); df_pie = df_pie[df_pie['Wartość'] > 0]
-            
-            if not df_pie.empty:
-                df_pie['Procent'] = df_pie['Wartość'] / df_pie['Wartość'].sum()
-                
-                # Paleta z kolorami (Nocleg=Złoty, Bus=Fiolet, Winiety=Oliwka)
-                pie_scale = alt.Scale(
-                    domain=["Atrakcje", "Trasa", "Nocleg", "Wynajem Busa", "Winiety", "Inne"],
-                    range=[COLOR_ACCENT, COLOR_SEC, COLOR_SPORT, COLOR_PARTY, COLOR_FOOD, "#888888"]
-                )
-                
-                base = alt.Chart(df_pie).encode(theta=alt.Theta("Wartość", stack=True))
-                
-                pie = base.mark_arc(innerRadius=50).encode(
-                    color=alt.Color("Kategoria", scale=pie_scale, legend=alt.Legend(orient="bottom", labelColor=COLOR_TEXT, columns=2)),
-                    order=alt.Order("Kategoria"), 
-                    tooltip=['Kategoria', alt.Tooltip('Wartość', format='.2f')]
-                )
-                
-                labels_bg = base.mark_text(radius=120, size=60).encode(
-                    text=alt.value("●"), color=alt.value("#1e2630"), opacity=alt.value(0.6), order=alt.Order("Kategoria")
-                )
-                labels_text = base.mark_text(radius=120, size=14, fontWeight="bold").encode(
-                    text=alt.Text("Procent", format=".0%"), order=alt.Order("Kategoria"), color=alt.value(COLOR_TEXT) 
-                )
-                
-                st.altair_chart(pie + labels_bg + labels_text, use_container_width=True)
+            spec = get_chart(("struktura", liczba_osob), lambda: cost_pie_spec(costs, liczba_osob, PALETA))
+            if spec is not None:
+                st.vega_lite_chart(spec=spec, use_container_width=True)
             else: st.caption("Brak danych.")
             
         with st.container(border=True):
@@ -887,41 +1036,116 @@ with tab_podsumowanie:
     with col_right:
         with st.container(border=True):
             st.markdown("#### 📅 Wykres wydatków w czasie")
-            if not df_A.empty:
+            if costs.daily:
                 # --- BAR CHART (FIX SORTOWANIA) ---
-                df_A['Data_Group'] = df_A['Start'].dt.date
-                df_A['Etykieta'] = df_A['Start'].dt.strftime('%d.%m')
-                # Klucz sortowania w formacie ISO (RRRR-MM-DD)
-                df_A['Day_Sort'] = df_A['Start'].dt.strftime('%Y-%m-%d')
-                
-                domain_bar = ["Atrakcja", "Trasa", "Jedzenie", "Impreza", "Sport/Rekreacja"]
-                range_bar = [COLOR_ACCENT, COLOR_SEC, COLOR_FOOD, COLOR_PARTY, COLOR_SPORT]
-
-                base = alt.Chart(df_A).encode(
-                    x=alt.X('Etykieta:O', 
-                            title='Dzień', 
-                            # FIX: op="min" wymusza poprawne sortowanie grup
-                            sort=alt.EncodingSortField(field="Day_Sort", op="min", order="ascending"), 
-                            axis=alt.Axis(labelAngle=0, labelColor=COLOR_TEXT, titleColor=COLOR_TEXT, grid=False)
-                    )
-                )
+                spec = get_chart("wydatki", lambda: daily_costs_spec(costs, PALETA))
+                st.vega_lite_chart(spec=spec, use_container_width=True)
+            else: st.info("Zaplanuj płatne atrakcje w kalendarzu, aby zobaczyć wykres czasu.")
 
-                bars = base.mark_bar(cornerRadiusTopLeft=3, cornerRadiusTopRight=3).encode(
-                    y=alt.Y('sum(Koszt):Q', title='Suma (PLN)', axis=alt.Axis(labelColor=COLOR_TEXT, titleColor=COLOR_TEXT, gridColor="#444444", gridOpacity=0.3)),
-                    color=alt.Color('Kategoria', scale=alt.Scale(domain=domain_bar, range=range_bar), legend=alt.Legend(orient="bottom", title=None, labelColor=COLOR_TEXT)),
-                    tooltip=['Etykieta', 'Kategoria', alt.Tooltip('sum(Koszt)', title='Kwota', format='.0f')]
-                )
+    # --- SCENARIUSZE ---
+    with st.expander("🧮 Co jeśli? Scenariusze paliwa i liczby osób"):
+        panel_scenariusze()
 
-                daily_totals = df_A.groupby(['Etykieta', 'Day_Sort'])['Koszt'].sum().reset_index()
-                
-                text_totals = alt.Chart(daily_totals).mark_text(
-                    align='center', baseline='bottom', dy=-5, size=12, color=COLOR_TEXT, fontWeight='bold'
-                ).encode(
-                    # Tutaj też dodajemy sortowanie
-                    x=alt.X('Etykieta:O', sort=alt.EncodingSortField(field="Day_Sort", op="min", order="ascending")),
-                    y=alt.Y('Koszt:Q'),
-                    text=alt.Text('Koszt:Q', format='.0f')
-                )
+    # --- ROZLICZENIE (KTO KOMU ILE) ---
+    with st.container(border=True):
+        st.markdown("#### 🤝 Rozliczenie kosztów wspólnych")
+        members = st.session_state.config_members
+        df_B = views.shared
+        if df_B.empty: st.caption("Brak kosztów wspólnych do rozliczenia.")
+        else:
+            def policz_rozliczenie():
+                saldo = balances(df_B, members)
+                return saldo, settle(saldo), df_B.loc[~df_B['Płatnik'].isin(members), 'Koszt'].sum()
+            saldo, przelewy, bez_platnika = get_chart(("rozliczenie", tuple(members)), policz_rozliczenie)
+            if bez_platnika > 0:
+                st.caption(f"⚠️ {bez_platnika:.2f} zł kosztów nie ma przypisanego płatnika - uzupełnij je w Edytorze (✏️ Kto płacił i za kogo).")
+            col_saldo, col_przelewy = st.columns([1, 1.5])
+            with col_saldo:
+                st.dataframe(saldo.rename("Saldo").rename_axis("Osoba").reset_index(), hide_index=True, use_container_width=True,
+                             column_config={"Saldo": st.column_config.NumberColumn(format="%.2f zł")})
+            with col_przelewy:
+                if przelewy.empty: st.success("Wszyscy są rozliczeni 🎉")
+                else:
+                    st.caption(f"Najmniej przelewów: {len(przelewy)}")
+                    st.dataframe(przelewy, hide_index=True, use_container_width=True,
+                                 column_config={"Kwota": st.column_config.NumberColumn(format="%.2f zł")})
+
+@st.fragment
+def panel_scenariusze():
+    # Tylko symulacja - nic nie trafia do danych wyprawy
+    views = get_views()
+    costs = st.session_state.db_costs
+    liczba_osob = st.session_state.config_people
+    paliwo_teraz = views.shared.loc[views.shared['Typ_Kosztu'] == 'Paliwo', 'Koszt'].sum()
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        dystans = st.number_input("Dystans (km)", min_value=0, value=800, step=50, key="scen_dystans")
+        auta = st.slider("Liczba aut", 1, 6, (1, 2), key="scen_auta")
+    with c2:
+        ceny = st.slider("Cena paliwa (PLN/l)", 3.0, 10.0, (6.0, 7.5), step=0.05, key="scen_ceny")
+        spalanie = st.slider("Spalanie (l/100km)", 1.0, 20.0, (6.0, 10.0), step=0.5, key="scen_spalanie")
+    with c3:
+        osoby = st.slider("Liczba osób", 1, 40, (max(1, liczba_osob - 2), liczba_osob + 2), key="scen_osoby")
+        zastap = st.checkbox("Zastąp obecne paliwo scenariuszem", value=True, key="scen_zastap",
+                             help=f"Obecnie wpisane paliwo: {paliwo_teraz:.0f} zł")
+
+    grid = scenario_grid(
+        base_shared=costs.shared - (paliwo_teraz if zastap else 0.0), individual=costs.individual, distance=dystans,
+        prices=np.unique(np.round(np.linspace(*ceny, 4), 2)), consumptions=np.unique(np.linspace(*spalanie, 3)),
+        cars=range(auta[0], auta[1] + 1), people=range(osoby[0], osoby[1] + 1))
+    st.caption(f"Przeliczono {len(grid)} wariantów.")
+
+    col_tab, col_wykres = st.columns([1, 1])
+    with col_tab:
+        s1, s2 = st.columns(2)
+        with s1: wybrane_auta = st.select_slider("Auta", options=sorted(grid['Auta'].unique()), key="scen_wybrane_auta")
+        with s2: wybrane_spalanie = st.select_slider("Spalanie", options=sorted(grid['Spalanie'].unique()), key="scen_wybrane_spalanie")
+        przekroj = grid[(grid['Auta'] == wybrane_auta) & (grid['Spalanie'] == wybrane_spalanie)]
+        tabela = przekroj.pivot(index='Osoby', columns='Cena paliwa', values='Na osobę')
+        tabela.columns = [f"{c:.2f} zł/l" for c in tabela.columns]
+        st.dataframe(tabela.round(0), use_container_width=True)
+    with col_wykres:
+        st.vega_lite_chart(spec=scenario_spec(przekroj, PALETA), use_container_width=True)
+
+    st.markdown("**Co najbardziej zmienia koszt na osobę?**")
+    st.vega_lite_chart(spec=sensitivity_spec(sensitivity(grid), PALETA), use_container_width=True)
 
-                st.altair_chart((bars + text_totals).properties(height=550), use_container_width=True)
-            else: st.info("Zaplanuj płatne atrakcje w kalendarzu, aby zobaczyć wykres czasu.")
+# ==========================================
+# 📑 GŁÓWNE ZAKŁADKI
+# ==========================================
+# on_change="rerun": wykonuje się tylko treść otwartej zakładki
+tab_edytor, tab_kalendarz, tab_podsumowanie = st.tabs(["📝 Edytor", "📅 Kalendarz", "💰 Podsumowanie"], key="aktywna_zakladka", on_change="rerun")
+
+if tab_edytor.open:
+    with tab_edytor, prof.section("zakładka: 📝 Edytor"): render_edytor()
+if tab_kalendarz.open:
+    with tab_kalendarz, prof.section("zakładka: 📅 Kalendarz"): render_kalendarz()
+if tab_podsumowanie.open:
+    with tab_podsumowanie, prof.section("zakładka: 💰 Podsumowanie"): panel_podsumowanie()
+
+# ==========================================
+# 🩺 DIAGNOSTYKA
+# ==========================================
+# Raport z całego przebiegu: log JSON i plik Prometheusa (gdy włączone w ustawieniach),
+# panel tylko pod adresem z ?diag=1.
+if prof.enabled:
+    raport = prof.report()
+    if diag_settings["enabled"]:
+        metryki = diagnostics_metrics()
+        metryki.observe(raport, storage.api_stats())
+        if diag_settings["log"]: log_report(raport, trip=st.session_state.current_trip_id, rows=len(st.session_state.db))
+        if diag_settings["prometheus_file"]:
+            try: metryki.write_prometheus(diag_settings["prometheus_file"])
+            except OSError as e: st.toast(f"Nie zapisano metryk: {e}", icon="⚠️")
+    if st.query_params.get("diag") == "1":
+        with st.expander(f"🩺 Diagnostyka przebiegu: {raport['total_ms']:.0f} ms", expanded=False):
+            sekcje = pd.DataFrame([{"Sekcja": k, "ms": v["ms"], "Wywołania": v["calls"]} for k, v in raport["sections"].items()])
+            st.dataframe(sekcje, hide_index=True, use_container_width=True)
+            c1, c2 = st.columns(2)
+            with c1:
+                st.markdown("**Zapytania GitHub (ten przebieg)**")
+                st.json(raport["github"] or {"backend": storage.label})
+            with c2:
+                st.markdown("**Cache**")
+                st.json(raport["caches"])
@@ -0,0 +1,165 @@
+import base64
+import hashlib
+import json
+import threading
+from collections import Counter
+from types import SimpleNamespace
+
+from github import GithubException
+
+from storage import blob_sha
+
+# ==========================================
+# 🐙 FAKE REPOZYTORIUM GITHUB (W PAMIĘCI)
+# ==========================================
+# Tylko te metody PyGithub, których używa GitHubStorage. Liczy wywołania i bajty,
+# więc benchmark pokazuje też, ile zapytań kosztowałaby dana ścieżka na prawdziwym API.
+class FakeRequester:
+    def __init__(self, repo):
+        self.repo = repo
+        self.rate_limiting = (5000, 5000)
+        self.rate_limiting_resettime = 0
+
+    def requestJson(self, verb, url, parameters=None, headers=None):
+        # Jedyne surowe zapytanie: drzewo gałęzi z ETag
+        self.repo.count("trees", 0)
+        with self.repo.lock:
+            tree = self.repo.commits[self.repo.head]["tree"]
+        etag = f'"{self.repo.head}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return 304, {"etag": etag}, ""
+        body = json.dumps({"tree": [{"path": p, "sha": s, "type": "blob"} for p, s in tree.items()]})
+        self.repo.bytes_in += len(body)
+        self.rate_limiting = (self.rate_limiting[0] - 1, self.rate_limiting[1])
+        return 200, {"etag": etag}, body
+
+
+class FakeRef:
+    def __init__(self, repo):
+        self.repo = repo
+        self.object = SimpleNamespace(sha=repo.head)
+
+    def edit(self, sha):
+        self.repo.count("ref.edit")
+        with self.repo.lock:
+            if self.repo.commits[sha]["parent"] != self.repo.head:
+                raise GithubException(422, {"message": "Update is not a fast forward"}, {})
+            self.repo.head = self.object.sha = sha
+
+
+class FakeRepository:
+    url = "https://api.github.invalid/repos/bench/trip"
+    default_branch = "main"
+
+    def __init__(self, files=None):
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.blobs = {}
+        self.commits = {}
+        self.head = self._new_commit({}, None, "init")
+        self.requester = FakeRequester(self)
+        if files: self.seed(files)
+
+    def count(self, name, size=0):
+        self.calls[name] += 1
+        self.bytes_out += size
+
+    def seed(self, files):
+        # Wgranie plików bez liczenia zapytań - stan początkowy benchmarku
+        tree = dict(self.commits[self.head]["tree"])
+        for path, content in files.items(): tree[path] = self._put_blob(content)
+        self.head = self._new_commit(tree, self.head, "seed")
+
+    def reset_counters(self):
+        self.calls.clear()
+        self.bytes_in = self.bytes_out = 0
+
+    def _put_blob(self, content):
+        data = content.encode("utf-8")
+        sha = blob_sha(data)
+        self.blobs[sha] = data
+        return sha
+
+    def _new_commit(self, tree, parent, message):
+        sha = hashlib.sha1(f"{parent}:{message}:{sorted(tree.items())}".encode()).hexdigest()
+        self.commits[sha] = {"tree": tree, "parent": parent, "message": message}
+        return sha
+
+    def _commit_files(self, changes, message):
+        with self.lock:
+            tree = dict(self.commits[self.head]["tree"])
+            for path, content in changes.items():
+                if content is None: tree.pop(path, None)
+                else: tree[path] = self._put_blob(content)
+            self.head = self._new_commit(tree, self.head, message)
+            return tree
+
+    # --- Contents API ---
+    def get_git_blob(self, sha):
+        data = self.blobs[sha]
+        self.count("get_git_blob")
+        self.bytes_in += len(data)
+        return SimpleNamespace(content=base64.b64encode(data).decode("ascii"))
+
+    def create_file(self, path, message, content):
+        self.count("create_file", len(content.encode("utf-8")))
+        tree = self._commit_files({path: content}, message)
+        return {"content": SimpleNamespace(sha=tree[path])}
+
+    def update_file(self, path, message, content, sha):
+        self.count("update_file", len(content.encode("utf-8")))
+        if self.commits[self.head]["tree"].get(path) != sha:
+            raise GithubException(409, {"message": f"{path} does not match {sha}"}, {})
+        tree = self._commit_files({path: content}, message)
+        return {"content": SimpleNamespace(sha=tree[path])}
+
+    def delete_file(self, path, message, sha):
+        self.count("delete_file")
+        if self.commits[self.head]["tree"].get(path) != sha:
+            raise GithubException(409, {"message": f"{path} does not match {sha}"}, {})
+        self._commit_files({path: None}, message)
+
+    # --- Git Data API ---
+    def get_git_ref(self, ref):
+        self.count("get_git_ref")
+        return FakeRef(self)
+
+    def get_git_commit(self, sha):
+        self.count("get_git_commit")
+        return SimpleNamespace(sha=sha, tree=SimpleNamespace(sha=sha))
+
+    def get_git_tree(self, sha, recursive=False):
+        # sha drzewa == sha commitu (tak wydaje get_git_commit)
+        self.count("get_git_tree")
+        tree = self.commits[sha]["tree"]
+        return SimpleNamespace(sha=sha, tree=[SimpleNamespace(path=p, sha=s, type="blob") for p, s in tree.items()])
+
+    def create_git_tree(self, elements, base_tree):
+        tree = dict(self.commits[base_tree.sha]["tree"])
+        sent = 0
+        for el in elements:
+            ident = el._identity
+            if "content" in ident:
+                sent += len(ident["content"].encode("utf-8"))
+                tree[ident["path"]] = self._put_blob(ident["content"])
+            elif ident.get("sha") is None: tree.pop(ident["path"], None)
+        self.count("create_git_tree", sent)
+        sha = self._new_commit(tree, None, "tree")
+        return SimpleNamespace(sha=sha, tree=[SimpleNamespace(path=p, sha=s) for p, s in tree.items()])
+
+    def create_git_commit(self, message, tree, parents):
+        self.count("create_git_commit")
+        with self.lock:
+            sha = self._new_commit(self.commits[tree.sha]["tree"], parents[0].sha, message)
+        return SimpleNamespace(sha=sha)
+
+
+class FakeGithub:
+    # Zamiast klienta z create_github_client: get_repo zwraca zawsze to samo repozytorium
+    def __init__(self, repo):
+        self.repo = repo
+
+    def get_repo(self, name):
+        return self.repo
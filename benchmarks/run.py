@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+import storage as storage_module
+from benchmarks.fake_github import FakeGithub, FakeRepository
+from benchmarks.synthetic import START, trip_files
+from charts import calendar_spec, cost_pie_spec, daily_costs_spec, payload_bytes
+from costs import CostTotals, balances, settle
+from ics_export import build_ics
+from planner import read_trip
+from scheduling import split_at_midnight
+from storage import GitHubStorage
+from trip_data import build_views
+
+# ==========================================
+# ⏱️ BENCHMARKI GORĄCYCH ŚCIEŻEK
+# ==========================================
+# python -m benchmarks.run --rows 10,1000,50000 --days 7,60 --out wyniki.json
+# Wyniki w JSON (czasy w ms + liczba zapytań do fake GitHuba), --baseline porównuje z poprzednim plikiem.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRIP_ID = "bench"
+ZAKLADKI = ["📝 Edytor", "📅 Kalendarz", "💰 Podsumowanie"]
+KALENDARZ_OKNO = 7
+PALETA = {'bg': "#1e2630", 'text': "#faf9dd", 'accent': "#ff6b35", 'sec': "#4a7a96",
+          'food': "#7c8c58", 'party': "#8c5e7c", 'sport': "#e0c068"}
+
+
+def measure(fn, repeat):
+    # Pierwsze wywołanie osobno (zimne), potem `repeat` pomiarów
+    t0 = time.perf_counter(); result = fn(); first = (time.perf_counter() - t0) * 1000
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); runs.append((time.perf_counter() - t0) * 1000)
+    return result, {"first": round(first, 3), "min": round(min(runs), 3), "median": round(statistics.median(runs), 3),
+                    "max": round(max(runs), 3), "runs": len(runs)}
+
+
+def load(store):
+    # Ta sama ścieżka co get_data w app.py (bez cache parsowania Streamlita): snapshot + dziennik
+    df, _, _ = read_trip(store, TRIP_ID)
+    return df
+
+
+def bench_core(rows, days, repeat):
+    files, _, members = trip_files(TRIP_ID, rows, days)
+    repo = FakeRepository(files)
+    results = {}
+
+    def cold():
+        return load(GitHubStorage(FakeRepository(files)))
+    df, results["get_data_cold"] = measure(cold, repeat)
+    warm_store = GitHubStorage(repo)
+    load(warm_store); repo.reset_counters()
+    _, results["get_data_warm"] = measure(lambda: load(warm_store), repeat)
+    results["get_data_warm"]["api_calls"] = sum(repo.calls.values())
+
+    views, results["masks"] = measure(lambda: build_views(df), repeat)
+    planned = views.planned
+    _, results["midnight_split"] = measure(lambda: split_at_midnight(planned), repeat)
+    spec, results["calendar_window"] = measure(lambda: calendar_spec(planned, START, min(days, KALENDARZ_OKNO), PALETA), repeat)
+    results["calendar_window"]["payload_bytes"] = payload_bytes(spec)
+    spec, results["calendar_full"] = measure(lambda: calendar_spec(planned, START, days, PALETA), repeat)
+    results["calendar_full"]["payload_bytes"] = payload_bytes(spec)
+    ics, results["ics"] = measure(lambda: build_ics(planned), repeat)
+    results["ics"]["bytes"] = len(ics)
+
+    costs, results["cost_totals"] = measure(lambda: CostTotals.from_frame(df), repeat)
+    _, results["summary_charts"] = measure(lambda: (cost_pie_spec(costs, len(members), PALETA), daily_costs_spec(costs, PALETA)), repeat)
+    _, results["settlement"] = measure(lambda: settle(balances(views.shared, members)), repeat)
+    return results
+
+
+def bench_apptest(rows, days, repeat):
+    from streamlit.testing.v1 import AppTest
+
+    files, _, _ = trip_files(TRIP_ID, rows, days)
+    files["registry.json"] = json.dumps({"current": TRIP_ID, "trips": {TRIP_ID: "Benchmark"}})
+    repo = FakeRepository(files)
+    storage_module.create_github_client = lambda token, **kwargs: FakeGithub(repo)
+    os.environ.pop("PLANER_STORAGE", None)
+    st.cache_resource.clear(); st.cache_data.clear()
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    at.secrets["github"] = {"token": "benchmark", "repo_name": "bench/trip"}
+    results = {}
+
+    def rerun(tab):
+        at.session_state["aktywna_zakladka"] = tab
+        at.run()
+        if at.exception: raise RuntimeError(at.exception[0].value)
+
+    t0 = time.perf_counter(); rerun(ZAKLADKI[0])
+    results["app_first_run"] = {"first": round((time.perf_counter() - t0) * 1000, 3), "api_calls": sum(repo.calls.values())}
+    for tab in ZAKLADKI:
+        repo.reset_counters()
+        _, results[f"app_rerun {tab}"] = measure(lambda: rerun(tab), repeat)
+        results[f"app_rerun {tab}"]["api_calls"] = sum(repo.calls.values())
+    return results
+
+
+def git_revision():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError: return None
+
+
+def compare(results, baseline_path):
+    # Mediana teraz / mediana w pliku bazowym dla tych samych przypadków
+    with open(baseline_path, encoding="utf-8") as f:
+        old = {(r["case"], r["rows"], r["days"]): r for r in json.load(f)["results"]}
+    for r in results:
+        prev = old.get((r["case"], r["rows"], r["days"]))
+        if not prev or not prev["ms"].get("median") or not r["ms"].get("median"): continue
+        ratio = r["ms"]["median"] / prev["ms"]["median"]
+        flag = "  <-- wolniej" if ratio > 1.2 else ""
+        print(f"{r['case']:<28} {r['rows']:>6} x {r['days']:<3} {prev['ms']['median']:>10.2f} -> {r['ms']['median']:>10.2f} ms ({ratio:.2f}x){flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarki planera na syntetycznych wyprawach")
+    parser.add_argument("--rows", default="10,1000,10000,50000", help="liczby wierszy, po przecinku")
+    parser.add_argument("--days", default="7,60", help="długości wyjazdu w dniach, po przecinku")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-apptest", action="store_true", help="bez pełnego przebiegu skryptu przez AppTest")
+    parser.add_argument("--apptest-max-rows", type=int, default=10000, help="AppTest tylko do tylu wierszy")
+    parser.add_argument("--out", default="-", help="plik JSON z wynikami ('-' = stdout)")
+    parser.add_argument("--baseline", help="poprzedni plik JSON do porównania")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # app.py czyta logo.png względem katalogu roboczego
+    results = []
+    for rows in map(int, args.rows.split(",")):
+        for days in map(int, args.days.split(",")):
+            cases = bench_core(rows, days, args.repeat)
+            if not args.no_apptest and rows <= args.apptest_max_rows:
+                cases.update(bench_apptest(rows, days, args.repeat))
+            for case, stats in cases.items():
+                extra = {k: stats.pop(k) for k in list(stats) if k not in ("first", "min", "median", "max", "runs")}
+                results.append({"case": case, "rows": rows, "days": days, "ms": stats, **extra})
+                print(f"{case:<28} {rows:>6} x {days:<3} {stats.get('median', stats['first']):>10.2f} ms", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(), "python": platform.python_version(), "platform": platform.platform(),
+            "pandas": pd.__version__, "streamlit": st.__version__, "altair": alt.__version__,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out == "-": print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(text + "\n")
+    if args.baseline: compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from costs import default_members, join_names
+from trip_data import JOURNAL_LIMIT, KOLUMNY, journal_lines, normalize_types, op_update, to_csv
+
+# ==========================================
+# 🧪 SYNTETYCZNE WYPRAWY DO BENCHMARKÓW
+# ==========================================
+# Proporcje jak w prawdziwych planach: głównie zaplanowane aktywności, trochę
+# poczekalni i kosztów wspólnych. Trasy startują wieczorem i przechodzą przez północ.
+START = date(2026, 7, 1)
+KATEGORIE_PLANU = ["Atrakcja", "Jedzenie", "Impreza", "Sport/Rekreacja"]
+KATEGORIE_WSPOLNE = ["Nocleg", "Wynajem Busa", "Winiety", "Inne"]
+
+
+def synthetic_trip(rows, days, people=12, seed=0, start=START):
+    rng = np.random.default_rng(seed)
+    members = default_members(people)
+    kind = rng.choice(["plan", "trasa", "poczekalnia", "wspolne", "paliwo"], size=rows, p=[0.6, 0.1, 0.15, 0.1, 0.05])
+
+    day = rng.integers(0, days, size=rows)
+    hour = np.where(kind == "trasa", rng.integers(19, 24, size=rows), rng.integers(7, 22, size=rows))
+    czas = np.where(kind == "trasa", rng.integers(3, 11, size=rows), rng.choice([0.5, 1.0, 1.5, 2.0, 3.0], size=rows)).astype(float)
+    start_ts = pd.Timestamp(start) + pd.to_timedelta(day, unit='D') + pd.to_timedelta(hour, unit='h')
+    planned = np.isin(kind, ["plan", "trasa"])
+    shared = np.isin(kind, ["wspolne", "paliwo"])
+
+    kategoria = np.where(kind == "trasa", "Trasa", rng.choice(KATEGORIE_PLANU, size=rows))
+    kategoria = np.where(shared, rng.choice(KATEGORIE_WSPOLNE, size=rows), kategoria)
+    typ = np.select([kind == "wspolne", kind == "paliwo"], ["Wspólny", "Paliwo"], "Indywidualny")
+    # Co trzeci koszt wspólny dzieli tylko część grupy
+    uczestnicy = [join_names(rng.choice(members, size=max(2, people // 3), replace=False)) if s and rng.random() < 0.33 else ""
+                  for s in shared]
+
+    df = pd.DataFrame({
+        'ID': [f"s{seed}x{i:06d}" for i in range(rows)],
+        'Tytuł': [f"{k} {i}" for i, k in enumerate(kategoria)],
+        'Kategoria': kategoria,
+        'Czas (h)': czas,
+        'Start': pd.Series(start_ts).where(planned, pd.NaT),
+        'Koniec': pd.Series(start_ts + pd.to_timedelta(czas, unit='h')).where(planned, pd.NaT),
+        'Zaplanowane': planned,
+        'Koszt': np.round(rng.gamma(2.0, 60.0, size=rows), 2),
+        'Typ_Kosztu': typ,
+        'Płatnik': np.where(shared, rng.choice(members, size=rows), ""),
+        'Uczestnicy': uczestnicy,
+    })
+    return normalize_types(df[KOLUMNY]), members
+
+
+def synthetic_journal(df, entries, seed=0):
+    # Dopiski jak po edycjach w aplikacji: zmiany kosztów i tytułów istniejących wierszy
+    rng = np.random.default_rng(seed + 1)
+    entries = min(entries, JOURNAL_LIMIT - 1, len(df))
+    ids = rng.choice(df['ID'].to_numpy(), size=entries, replace=False)
+    return journal_lines([op_update(row_id, Koszt=float(rng.integers(10, 500))) for row_id in ids])
+
+
+def trip_files(trip_id, rows, days, people=12, seed=0):
+    # -> ({ścieżka: treść}, ramka, uczestnicy) dla jednej wyprawy w formacie aplikacji
+    df, members = synthetic_trip(rows, days, people, seed)
+    config = {"trip_name": f"Benchmark {rows}x{days}", "start_date": START.strftime("%Y-%m-%d"),
+              "days": days, "people": people, "members": members}
+    files = {
+        f"{trip_id}_data.csv": to_csv(df),
+        f"{trip_id}_journal.jsonl": synthetic_journal(df, rows // 10, seed),
+        f"{trip_id}_config.json": json.dumps(config, indent=4),
+    }
+    return files, df, members
@@ -0,0 +1,143 @@
+import csv
+import io
+import re
+from datetime import datetime
+
+import pandas as pd
+
+from trip_data import KATEGORIE, TYPY_KOSZTU, make_row
+
+# ==========================================
+# 📥 IMPORT HURTOWY (CSV / ICS)
+# ==========================================
+# Wiersze czytane strumieniowo, walidowane do schematu wyprawy i zapisywane
+# jednym save_changes (jedna paczka operacji w dzienniku).
+ALIASY = {
+    'Tytuł': ['tytuł', 'tytul', 'nazwa', 'title', 'name', 'summary', 'atrakcja'],
+    'Kategoria': ['kategoria', 'category', 'typ'],
+    'Czas (h)': ['czas (h)', 'czas', 'godziny', 'duration', 'hours', 'h'],
+    'Koszt': ['koszt', 'cena', 'cost', 'price'],
+    'Start': ['start', 'data', 'date', 'kiedy', 'dtstart'],
+    'Typ_Kosztu': ['typ_kosztu', 'typ kosztu'],
+}
+_KOLUMNA_Z_ALIASU = {alias: col for col, aliasy in ALIASY.items() for alias in aliasy}
+
+
+def _text_stream(source):
+    if isinstance(source, str): return io.StringIO(source)
+    if isinstance(source, bytes): source = io.BytesIO(source)
+    return io.TextIOWrapper(source, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def read_csv_rows(source):
+    # Generator (nr_linii, dict) - nagłówki rozpoznawane po aliasach, separator , lub ;
+    stream = _text_stream(source)
+    sample = stream.read(4096); stream.seek(0)
+    try: dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error: dialect = csv.excel
+    reader = csv.reader(stream, dialect)
+    header = next(reader, None)
+    if header is None: return
+    cols = [_KOLUMNA_Z_ALIASU.get(h.strip().lower()) for h in header]
+    for line_no, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values): continue
+        yield line_no, {col: v.strip() for col, v in zip(cols, values) if col}
+
+
+def _unescape_ics(value):
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _parse_ics_date(value):
+    value = value.strip().rstrip("Z")
+    for fmt in ('%Y%m%dT%H%M%S', '%Y%m%dT%H%M', '%Y%m%d'):
+        try: return datetime.strptime(value, fmt)
+        except ValueError: continue
+    return None
+
+
+def read_ics_rows(source):
+    # Generator (nr_linii, dict) dla każdego VEVENT; zawinięte linie (RFC 5545) sklejane w locie
+    event, start_line, pending = None, 0, None
+
+    def handle(line_no, line):
+        nonlocal event, start_line
+        name, _, value = line.partition(":")
+        name = name.split(";")[0].upper()
+        if name == "BEGIN" and value.upper() == "VEVENT": event, start_line = {}, line_no
+        elif name == "END" and value.upper() == "VEVENT" and event is not None:
+            row = {'Tytuł': _unescape_ics(event.get('SUMMARY', "")), 'Start': _parse_ics_date(event.get('DTSTART', ""))}
+            end = _parse_ics_date(event.get('DTEND', ""))
+            if row['Start'] and end: row['Czas (h)'] = (end - row['Start']).total_seconds() / 3600
+            event = None
+            return start_line, row
+        elif event is not None: event[name] = value
+        return None
+
+    for line_no, raw in enumerate(_text_stream(source), start=1):
+        raw = raw.rstrip("\r\n")
+        if raw[:1] in (" ", "\t") and pending is not None:
+            pending = (pending[0], pending[1] + raw[1:]); continue
+        if pending is not None:
+            done = handle(*pending)
+            if done: yield done
+        pending = (line_no, raw)
+    if pending is not None:
+        done = handle(*pending)
+        if done: yield done
+
+
+def _number(value, default):
+    if value is None or (isinstance(value, str) and not value.strip()): return default
+    if isinstance(value, str): value = value.replace(" ", "").replace("zł", "").replace(",", ".")
+    try: return float(value)
+    except ValueError: raise ValueError(f"niepoprawna liczba '{value}'") from None
+
+
+def _date(value):
+    # ISO (2026-07-24 10:00) albo polski zapis z dniem na początku (24.07.2026 10:00)
+    if not value: return None
+    try: return pd.to_datetime(value, dayfirst=not re.match(r"\d{4}-", value))
+    except ValueError: raise ValueError(f"niepoprawna data '{value}'") from None
+
+
+def normalize_rows(rows):
+    # -> (ramka gotowych wierszy, lista błędów "linia N: powód")
+    valid, errors = [], []
+    for line_no, raw in rows:
+        try:
+            tytul = str(raw.get('Tytuł') or "").strip()
+            if not tytul: raise ValueError("brak tytułu")
+            kategoria = str(raw.get('Kategoria') or "").strip()
+            kategoria = next((k for k in KATEGORIE if k.lower() == kategoria.lower()), "Inne" if kategoria else "Atrakcja")
+            czas = _number(raw.get('Czas (h)'), 1.0)
+            koszt = _number(raw.get('Koszt'), 0.0)
+            if czas < 0 or koszt < 0: raise ValueError("ujemny czas lub koszt")
+            typ = str(raw.get('Typ_Kosztu') or "Indywidualny").strip()
+            if typ not in TYPY_KOSZTU: raise ValueError(f"nieznany typ kosztu '{typ}'")
+            start = raw.get('Start')
+            if isinstance(start, str): start = _date(start)
+            if start is not None and pd.isna(start): start = None
+        except (ValueError, TypeError) as e:
+            errors.append(f"linia {line_no}: {e}")
+            continue
+        planned = start is not None and typ == "Indywidualny"
+        valid.append(make_row(**{
+            'Tytuł': tytul, 'Kategoria': kategoria, 'Czas (h)': czas, 'Koszt': koszt, 'Typ_Kosztu': typ,
+            'Start': start if planned else None,
+            'Koniec': start + pd.Timedelta(hours=czas) if planned else None,
+            'Zaplanowane': planned,
+        }))
+    return pd.DataFrame(valid), errors
+
+
+def title_key(titles):
+    # Klucz porównania tytułów: bez wielkości liter i nadmiarowych spacji
+    return titles.astype(str).str.casefold().str.split().str.join(" ")
+
+
+def mark_duplicates(new, existing_titles):
+    # Kolumna 'Duplikat': tytuł jest już w wyprawie albo powtarza się w imporcie
+    if new.empty: return new.assign(Duplikat=pd.Series(dtype=bool))
+    keys = title_key(new['Tytuł'])
+    return new.assign(Duplikat=keys.isin(set(title_key(existing_titles))) | keys.duplicated())
@@ -0,0 +1,316 @@
+import html
+import json
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import altair as alt
+import pandas as pd
+import pyarrow as pa
+
+from scheduling import event_bounds, split_at_midnight
+
+# ==========================================
+# 🧠 PAMIĘĆ GOTOWYCH WYKRESÓW
+# ==========================================
+# Klucz: (id wyprawy, wersja danych, dni, data startu, widok). Spec Vega-Lite
+# (albo plik ICS) budujemy raz; kolejne wyświetlenia niezmienionego planu go tylko odczytują.
+# Blokada, bo plik ICS jest generowany w wątku przycisku pobierania.
+class ChartCache:
+    def __init__(self, max_entries=24):
+        self.max_entries = max_entries
+        self._specs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._specs)
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._specs:
+                self._specs.move_to_end(key)
+                self.hits += 1
+                return self._specs[key]
+            self.misses += 1
+        spec = build()
+        with self._lock:
+            self._specs[key] = spec
+            while len(self._specs) > self.max_entries:
+                self._specs.popitem(last=False)
+        return spec
+
+    def evict(self, trip_id):
+        # Po edycji wyprawy jej stare wykresy są już nieaktualne
+        with self._lock:
+            for key in [k for k in self._specs if k[0] == trip_id]:
+                del self._specs[key]
+
+
+# Górny limit tego, co jeden wykres wysyła do przeglądarki (spec + dane Arrow)
+CHART_BUDGET_BYTES = 320 * 1024
+
+_altair_lock = threading.Lock()
+
+
+def _narrow(field):
+    # large_string (domyślny dla pandas 3) ma 8-bajtowe offsety - do wykresu wystarczą 4
+    if pa.types.is_large_string(field.type): return field.with_type(pa.string())
+    if pa.types.is_dictionary(field.type) and pa.types.is_large_string(field.type.value_type):
+        return field.with_type(pa.dictionary(field.type.index_type, pa.string()))
+    return field
+
+
+def to_arrow_bytes(df):
+    table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    table = table.cast(pa.schema([_narrow(f) for f in table.schema])).replace_schema_metadata(None)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _named_dataset(data, datasets):
+    # Zamiast wklejać wiersze do JSON-a zostawiamy dane pod nazwą jako gotowe
+    # bajty Arrow - st.vega_lite_chart wysyła je bez ponownej serializacji
+    name = f"data_{id(data):x}"
+    if name not in datasets: datasets[name] = to_arrow_bytes(data)
+    return {"name": name}
+
+
+alt.data_transformers.register("planer_datasets", _named_dataset)
+
+
+def to_spec(chart):
+    datasets = {}
+    with _altair_lock:
+        with alt.data_transformers.enable("planer_datasets", datasets=datasets), alt.theme.enable("none"):
+            spec = chart.to_dict(validate=False)  # spec jest stały w kodzie, walidacja JSON Schema to tylko koszt
+    spec["datasets"] = datasets
+    return spec
+
+
+def payload_bytes(spec):
+    # Rozmiar tego, co trafi do przeglądarki: JSON specyfikacji + dane Arrow
+    datasets = spec.get("datasets", {})
+    rest = {k: v for k, v in spec.items() if k != "datasets"}
+    return len(json.dumps(rest)) + sum(len(d) for d in datasets.values())
+
+
+# ==========================================
+# 📅 KALENDARZ (WIDOK DESKTOPOWY)
+# ==========================================
+def in_window(events, start_date, days):
+    # Wydarzenia nachodzące na okno [start_date, start_date + days)
+    if events.empty: return events
+    start, end = event_bounds(events)
+    od = pd.Timestamp(start_date).to_datetime64()
+    do = (pd.Timestamp(start_date) + pd.Timedelta(days=days)).to_datetime64()
+    return events[(start < do) & (end > od)]
+
+
+def calendar_spec(planned, start_date, days, palette):
+    # Rysuje tylko okno dni [start_date, start_date + days) - koszt zależy od okna, nie od długości wyjazdu
+    planned = in_window(planned, start_date, days)
+    all_dates = [start_date + timedelta(days=i) for i in range(days)]
+    all_days_labels = [d.strftime('%d.%m %A') for d in all_dates]
+    domain = ["Atrakcja", "Trasa", "Jedzenie", "Impreza", "Sport/Rekreacja"]
+    range_colors = [palette['accent'], palette['sec'], palette['food'], palette['party'], palette['sport']]
+    calc_width = max(len(all_days_labels) * 120, 600)
+
+    # --- LOGIKA CIĘCIA PRZEZ PÓŁNOC (FIX) ---
+    # Do przeglądarki idą tylko kolumny użyte w kodowaniu i podpowiedziach
+    df_chart = split_at_midnight(planned[['Tytuł', 'Kategoria', 'Czas (h)', 'Start', 'Koniec', 'Koszt']])
+    df_chart = df_chart[['Day_Label', 'Tytuł', 'Kategoria', 'Start', 'Koniec', 'Koszt']]
+    df_chart = df_chart[df_chart['Day_Label'].isin(all_days_labels)]  # segmenty poza oknem i tak nie mają kolumny
+    df_chart['Day_Label'] = df_chart['Day_Label'].astype(pd.CategoricalDtype(all_days_labels))
+    df_chart['Kategoria'] = df_chart['Kategoria'].cat.remove_unused_categories()
+    df_chart['Koszt'] = df_chart['Koszt'].astype('float32')
+
+    if not df_chart.empty:
+        bars = alt.Chart(df_chart).mark_bar(
+            cornerRadius=4,
+            width=60
+        ).encode(
+            x=alt.X('Day_Label:N',
+                    title=None,
+                    scale=alt.Scale(domain=all_days_labels, paddingInner=0.05),
+                    axis=alt.Axis(
+                        labelColor=palette['text'],
+                        labelFontSize=13,
+                        labelFontWeight="bold",
+                        labelAngle=0,
+                        orient='top',
+                        domainColor=palette['bg'],
+                        tickColor=palette['bg']
+                    )
+            ),
+            y=alt.Y('hoursminutes(Start):T',
+                    title=None,
+                    scale=alt.Scale(reverse=True),
+                    axis=alt.Axis(
+                        format='%H:%M',
+                        labelColor=palette['text'],
+                        grid=True,
+                        gridColor="#444444",
+                        gridOpacity=0.3,
+                        domain=False,
+                        tickColor=palette['bg']
+                    )
+            ),
+            y2='hoursminutes(Koniec):T',
+            color=alt.Color('Kategoria', scale=alt.Scale(domain=domain, range=range_colors), legend=None),
+            tooltip=['Tytuł', 'Kategoria', 'Start', 'Koniec', 'Koszt']
+        )
+
+        text = bars.mark_text(
+            align='center', baseline='middle', dy=-10,
+            color='white', fontWeight='bold', fontSize=10, limit=55
+        ).encode(text='Tytuł')
+
+        text_time = bars.mark_text(
+            align='center', baseline='middle', dy=5,
+            color='white', opacity=0.8, fontSize=9
+        ).encode(text=alt.Text('hoursminutes(Start):T', format='%H:%M'))
+
+        final_chart = (bars + text + text_time)
+    else:
+        final_chart = alt.Chart(pd.DataFrame({'Day_Label': all_days_labels})).mark_rect().encode(
+            x=alt.X('Day_Label:N', scale=alt.Scale(domain=all_days_labels, paddingInner=0.05), axis=alt.Axis(labelColor=palette['text'], orient='top'))
+        )
+
+    final_chart = final_chart.properties(
+        height=800,
+        width=calc_width,
+        background=palette['bg']
+    ).configure_view(
+        stroke=palette['bg'],
+        strokeWidth=0
+    )
+    return to_spec(final_chart)
+
+
+# ==========================================
+# 💰 PODSUMOWANIE
+# ==========================================
+def cost_pie_spec(costs, people, palette):
+    # Zwraca None, gdy nie ma czego pokazać; czyta gotowe sumy z CostTotals
+    pie_data = [{'Kategoria': 'Atrakcje', 'Wartość': costs.individual}]
+    for kategoria, koszt in sorted(costs.shared_by_category.items()):
+        pie_data.append({'Kategoria': kategoria, 'Wartość': koszt / people})
+
+    df_pie = pd.DataFrame(pie_data); df_pie = df_pie[df_pie['Wartość'] > 0]
+    if df_pie.empty: return None
+    df_pie['Procent'] = df_pie['Wartość'] / df_pie['Wartość'].sum()
+
+    # Paleta z kolorami (Nocleg=Złoty, Bus=Fiolet, Winiety=Oliwka)
+    pie_scale = alt.Scale(
+        domain=["Atrakcje", "Trasa", "Nocleg", "Wynajem Busa", "Winiety", "Inne"],
+        range=[palette['accent'], palette['sec'], palette['sport'], palette['party'], palette['food'], "#888888"]
+    )
+
+    base = alt.Chart(df_pie).encode(theta=alt.Theta("Wartość", stack=True))
+    pie = base.mark_arc(innerRadius=50).encode(
+        color=alt.Color("Kategoria", scale=pie_scale, legend=alt.Legend(orient="bottom", labelColor=palette['text'], columns=2)),
+        order=alt.Order("Kategoria"),
+        tooltip=['Kategoria', alt.Tooltip('Wartość', format='.2f')]
+    )
+    labels_bg = base.mark_text(radius=120, size=60).encode(
+        text=alt.value("●"), color=alt.value("#1e2630"), opacity=alt.value(0.6), order=alt.Order("Kategoria")
+    )
+    labels_text = base.mark_text(radius=120, size=14, fontWeight="bold").encode(
+        text=alt.Text("Procent", format=".0%"), order=alt.Order("Kategoria"), color=alt.value(palette['text'])
+    )
+    return to_spec(pie + labels_bg + labels_text)
+
+
+def daily_costs_spec(costs, palette):
+    # Sumy dzień x kategoria pochodzą z CostTotals, a nie z Vegi w przeglądarce
+    per_category = costs.daily_frame().sort_values(by=['Dzień', 'Kategoria'])
+    daily_totals = per_category.groupby('Dzień', sort=True)['Koszt'].sum().reset_index()
+    for frame in (per_category, daily_totals):
+        frame['Etykieta'] = frame['Dzień'].dt.strftime('%d.%m')
+        del frame['Dzień']
+    # Kolejność dni podana wprost zamiast pola sortującego w danych
+    order = list(dict.fromkeys(daily_totals['Etykieta']))
+
+    domain_bar = ["Atrakcja", "Trasa", "Jedzenie", "Impreza", "Sport/Rekreacja"]
+    range_bar = [palette['accent'], palette['sec'], palette['food'], palette['party'], palette['sport']]
+
+    bars = alt.Chart(per_category).mark_bar(cornerRadiusTopLeft=3, cornerRadiusTopRight=3).encode(
+        x=alt.X('Etykieta:O', title='Dzień', sort=order,
+                axis=alt.Axis(labelAngle=0, labelColor=palette['text'], titleColor=palette['text'], grid=False)),
+        y=alt.Y('Koszt:Q', stack=True, title='Suma (PLN)', axis=alt.Axis(labelColor=palette['text'], titleColor=palette['text'], gridColor="#444444", gridOpacity=0.3)),
+        color=alt.Color('Kategoria', scale=alt.Scale(domain=domain_bar, range=range_bar), legend=alt.Legend(orient="bottom", title=None, labelColor=palette['text'])),
+        tooltip=['Etykieta', 'Kategoria', alt.Tooltip('Koszt:Q', title='Kwota', format='.0f')]
+    )
+    text_totals = alt.Chart(daily_totals).mark_text(
+        align='center', baseline='bottom', dy=-5, size=12, color=palette['text'], fontWeight='bold'
+    ).encode(
+        x=alt.X('Etykieta:O', sort=order),
+        y=alt.Y('Koszt:Q'),
+        text=alt.Text('Koszt:Q', format='.0f')
+    )
+    return to_spec((bars + text_totals).properties(height=550))
+
+
+# ==========================================
+# 📱 AGENDA MOBILNA
+# ==========================================
+DNI_TYGODNIA = {'Monday': 'Poniedziałek', 'Tuesday': 'Wtorek', 'Wednesday': 'Środa', 'Thursday': 'Czwartek',
+                'Friday': 'Piątek', 'Saturday': 'Sobota', 'Sunday': 'Niedziela'}
+
+
+def agenda_days(planned, palette):
+    # {dzień: jeden blok HTML z nagłówkiem i wszystkimi kartami}; pola kart formatowane wektorowo
+    if planned.empty: return {}
+    kolory = {"Atrakcja": (palette['accent'], "#faf9dd"), "Trasa": (palette['sec'], "#ffffff"),
+              "Jedzenie": (palette['food'], "#ffffff"), "Impreza": (palette['party'], "#ffffff"),
+              "Sport/Rekreacja": (palette['sport'], "#ffffff")}
+    kat = planned['Kategoria'].astype(str)
+    bg = kat.map(lambda k: kolory.get(k, ("#444444", "#dddddd"))[0])
+    fg = kat.map(lambda k: kolory.get(k, ("#444444", "#dddddd"))[1])
+    koniec = planned['Start'] + pd.to_timedelta(planned['Czas (h)'], unit='h')
+    czas = (planned['Start'].dt.strftime('%H:%M') + " - " + koniec.dt.strftime('%H:%M')
+            + " (" + planned['Czas (h)'].astype(int).astype(str) + "h)")
+    koszt = planned['Koszt'].map(lambda v: f"<span style='float:right; font-weight:bold; background-color:rgba(255,255,255,0.2); padding: 2px 6px; border-radius:4px;'>{v:.0f} zł</span>" if v > 0 else "")
+
+    cards = ("<div style='background-color: " + bg + "; color: " + fg + "; padding: 15px; border-radius: 12px; margin-bottom: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.15); border-left: 6px solid rgba(0,0,0,0.2);'>"
+             + "<div style='font-size: 0.9rem; opacity: 0.9; margin-bottom: 4px; display: flow-root;'><span>⏱️ " + czas + "</span>" + koszt + "</div>"
+             + "<div style='font-size: 1.2rem; font-weight: 700; line-height: 1.2; margin-bottom: 4px;'>" + planned['Tytuł'].map(html.escape) + "</div>"
+             + "<div style='font-size: 0.75rem; opacity: 0.7; text-transform: uppercase; letter-spacing: 1px;'>" + kat.map(html.escape) + "</div>"
+             + "</div>")
+
+    days = {}
+    for day, day_cards in cards.groupby(planned['Start'].dt.date.to_numpy(), sort=True):
+        day_pl = DNI_TYGODNIA.get(day.strftime('%A'), day.strftime('%A'))
+        header = f"<h4>🗓️ {day.strftime('%d.%m')} • {day_pl}</h4>"
+        days[day] = header + "".join(day_cards) + "<div style='height: 1rem;'></div>"
+    return days
+
+
+# ==========================================
+# 🧮 SCENARIUSZE
+# ==========================================
+def scenario_spec(grid, palette):
+    # Koszt na osobę w funkcji liczby osób, osobna linia dla każdej ceny paliwa
+    data = grid[['Osoby', 'Cena paliwa', 'Na osobę']]
+    chart = alt.Chart(data).mark_line(point=True).encode(
+        x=alt.X('Osoby:O', axis=alt.Axis(labelAngle=0, labelColor=palette['text'], titleColor=palette['text'])),
+        y=alt.Y('Na osobę:Q', title='Na osobę (PLN)', axis=alt.Axis(labelColor=palette['text'], titleColor=palette['text'], gridColor="#444444", gridOpacity=0.3)),
+        color=alt.Color('Cena paliwa:O', scale=alt.Scale(scheme='goldorange'), legend=alt.Legend(orient="bottom", labelColor=palette['text'], titleColor=palette['text'])),
+        tooltip=['Osoby', alt.Tooltip('Cena paliwa', format='.2f'), alt.Tooltip('Na osobę', format='.0f')]
+    )
+    return to_spec(chart.properties(height=350))
+
+
+def sensitivity_spec(sens, palette):
+    # "Tornado": pasek od minimum do maksimum kosztu na osobę dla każdego parametru
+    chart = alt.Chart(sens).mark_bar(cornerRadius=3, color=palette['accent']).encode(
+        y=alt.Y('Parametr:N', sort=list(sens['Parametr']), title=None, axis=alt.Axis(labelColor=palette['text'])),
+        x=alt.X('Min:Q', title='Na osobę (PLN)', axis=alt.Axis(labelColor=palette['text'], titleColor=palette['text'], gridColor="#444444", gridOpacity=0.3)),
+        x2='Max:Q',
+        tooltip=['Parametr', alt.Tooltip('Min', format='.0f'), alt.Tooltip('Max', format='.0f')]
+    )
+    return to_spec(chart.properties(height=200))
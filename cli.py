@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tomllib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from ics_export import iter_ics
+from planner import check_trip, read_config, read_registry, read_trip, trip_summary
+from storage import create_storage, storage_settings
+from trip_data import build_views
+
+# ==========================================
+# 🖥️ CLI: PRZETWARZANIE WIELU WYPRAW NARAZ
+# ==========================================
+# python cli.py --path planer_data --ics eksport/ --workers 4
+# Dla każdej wyprawy z registry.json: podsumowanie kosztów, kontrola spójności i (opcjonalnie) plik .ics.
+# Wyprawy liczone równolegle w procesach; każda linia JSON na stdout zaraz po skończeniu wyprawy.
+_storage = None
+
+
+def _init_worker(settings, secrets):
+    # Jedno połączenie z bazą na proces roboczy
+    global _storage
+    _storage = create_storage(settings, secrets)
+
+
+def process_trip(trip_id, name, ics_dir, summary, check):
+    t0 = time.perf_counter()
+    result = {"trip": trip_id, "name": name}
+    try:
+        df, migrated, journal_count = read_trip(_storage, trip_id)
+        config = read_config(_storage, trip_id)
+        result["journal"] = journal_count
+        # Plik bez kolumny ID: ID wyliczone z treści wierszy, zapisze je dopiero aplikacja przy otwarciu wyprawy
+        if migrated is not None: result["needs_migration"] = True
+        if summary: result["summary"] = trip_summary(df, config)
+        if check: result["issues"] = check_trip(df, config)
+        if ics_dir:
+            path = os.path.join(ics_dir, f"{trip_id}.ics")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                for line in iter_ics(build_views(df).planned): f.write(line + "\r\n")
+            result["ics"] = path
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+
+
+def run_parallel(trips, workers, settings, secrets, **options):
+    # Generator wyników w kolejności kończenia; w kolejce najwyżej 2 zadania na proces
+    pending, queue = set(), iter(trips.items())
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(settings, secrets)) as pool:
+        def submit_next():
+            for trip_id, name in queue:
+                pending.add(pool.submit(process_trip, trip_id, name, **options))
+                return
+
+        for _ in range(workers * 2): submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                submit_next()
+                yield future.result()
+
+
+def load_secrets(path):
+    if not path or not os.path.exists(path): return {}
+    with open(path, "rb") as f: return tomllib.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Podsumowania, kontrola spójności i eksport ICS dla wypraw z rejestru")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"), help="plik z sekcjami [github] / [storage]")
+    parser.add_argument("--backend", choices=["local", "github"], help="nadpisuje [storage] backend")
+    parser.add_argument("--path", help="katalog danych dla backendu local")
+    parser.add_argument("--trips", help="tylko te ID wypraw, po przecinku (domyślnie wszystkie z rejestru)")
+    parser.add_argument("--ics", metavar="KATALOG", help="zapisz <id>.ics dla każdej wyprawy")
+    parser.add_argument("--no-summary", action="store_true", help="bez podsumowania kosztów")
+    parser.add_argument("--no-check", action="store_true", help="bez kontroli spójności")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    secrets = load_secrets(args.secrets)
+    settings = storage_settings(secrets)
+    if args.backend: settings["backend"] = args.backend
+    if args.path: settings["path"] = args.path
+
+    registry = read_registry(create_storage(settings, secrets)) or {}
+    trips = registry.get("trips", {})
+    if args.trips:
+        wanted = [t.strip() for t in args.trips.split(",") if t.strip()]
+        trips = {t: trips.get(t, t) for t in wanted}
+    if not trips:
+        print("Brak wypraw w rejestrze.", file=sys.stderr)
+        return 1
+    if args.ics: os.makedirs(args.ics, exist_ok=True)
+
+    failed = 0
+    for result in run_parallel(trips, max(1, min(args.workers, len(trips))), settings, secrets,
+                               ics_dir=args.ics, summary=not args.no_summary, check=not args.no_check):
+        failed += bool(result.get("error") or result.get("issues"))
+        print(json.dumps(result, ensure_ascii=False, default=str), flush=True)
+    # Kod wyjścia dla crona: 1 = któraś wyprawa ma błąd albo problemy spójności
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
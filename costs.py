@@ -0,0 +1,172 @@
+import heapq
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from trip_data import SEPARATOR_OSOB, TYPY_WSPOLNE, decode_fields
+
+# ==========================================
+# 💰 SUMY KOSZTÓW (AKTUALIZOWANE PRZYROSTOWO)
+# ==========================================
+# Pełne przeliczenie tylko przy wczytaniu wyprawy; każda operacja z dziennika
+# odejmuje stary wkład wiersza i dodaje nowy - O(1) na add / update / delete.
+def _koszt(value):
+    try: value = float(value)
+    except (TypeError, ValueError): return 0.0
+    return 0.0 if pd.isna(value) else value
+
+
+def _counts_as_planned(row):
+    return row.get('Typ_Kosztu') == 'Indywidualny' and bool(row.get('Zaplanowane')) and not pd.isna(row.get('Start'))
+
+
+class CostTotals:
+    def __init__(self):
+        self.individual = 0.0                   # zaplanowane aktywności indywidualne
+        self.shared = 0.0                       # koszty wspólne + paliwo (całość)
+        self.shared_by_category = defaultdict(float)
+        self.daily = defaultdict(float)         # (dzień, kategoria) -> suma aktywności
+
+    @classmethod
+    def from_frame(cls, df):
+        totals = cls()
+        planned = df[(df['Typ_Kosztu'] == 'Indywidualny') & df['Zaplanowane'] & df['Start'].notna()]
+        shared = df[df['Typ_Kosztu'].isin(TYPY_WSPOLNE)]
+        totals.individual = float(planned['Koszt'].sum())
+        totals.shared = float(shared['Koszt'].sum())
+        by_cat = shared.groupby(shared['Kategoria'].astype(str))['Koszt'].sum()
+        totals.shared_by_category.update(by_cat[by_cat != 0].to_dict())
+        by_day = planned.groupby([planned['Start'].dt.date, planned['Kategoria'].astype(str)])['Koszt'].sum()
+        totals.daily.update(by_day[by_day != 0].to_dict())
+        return totals
+
+    def _add(self, bucket, key, amount):
+        bucket[key] += amount
+        if abs(bucket[key]) < 1e-9: del bucket[key]
+
+    def add_row(self, row, sign=1):
+        koszt = sign * _koszt(row.get('Koszt'))
+        if not koszt: return
+        if _counts_as_planned(row):
+            self.individual += koszt
+            self._add(self.daily, (pd.Timestamp(row['Start']).date(), str(row.get('Kategoria'))), koszt)
+        elif row.get('Typ_Kosztu') in TYPY_WSPOLNE:
+            self.shared += koszt
+            self._add(self.shared_by_category, str(row.get('Kategoria')), koszt)
+
+    def apply(self, ops, lookup):
+        # lookup(id) -> dict wiersza sprzed zmian albo None; wiersze dodane w tej paczce śledzimy sami
+        touched = {}
+        for op in ops:
+            kind = op.get("op")
+            if kind == "add":
+                row = decode_fields(op["row"])
+                touched[row['ID']] = row
+                self.add_row(row)
+                continue
+            row_id = op["id"]
+            old = touched[row_id] if row_id in touched else lookup(row_id)
+            if old is None: continue
+            self.add_row(old, -1)
+            if kind == "update":
+                new = {**old, **decode_fields(op["fields"])}
+                touched[row_id] = new
+                self.add_row(new)
+            elif kind == "delete":
+                touched[row_id] = None
+
+    def daily_frame(self):
+        # Dzień x kategoria -> ramka dla wykresu wydatków w czasie
+        if not self.daily: return pd.DataFrame(columns=['Dzień', 'Kategoria', 'Koszt'])
+        keys = list(self.daily)
+        return pd.DataFrame({
+            'Dzień': pd.to_datetime([k[0] for k in keys]),
+            'Kategoria': [k[1] for k in keys],
+            'Koszt': list(self.daily.values()),
+        })
+
+
+# ==========================================
+# 🤝 ROZLICZENIE: KTO KOMU ILE
+# ==========================================
+def default_members(people):
+    return [f"Osoba {i + 1}" for i in range(int(people))]
+
+
+def split_names(value):
+    return [n.strip() for n in str(value or "").split(SEPARATOR_OSOB) if n.strip()]
+
+
+def join_names(names):
+    return SEPARATOR_OSOB.join(names)
+
+
+def balances(shared, members):
+    # Saldo osoby = zapłaciła - jej udział w kosztach. Dodatnie: ktoś jej oddaje.
+    # Koszty bez płatnika z listy nie wchodzą do rozliczenia.
+    members = list(members)
+    pos = {name: i for i, name in enumerate(members)}
+    saldo = np.zeros(len(members))
+    paid = shared[shared['Płatnik'].isin(pos)]
+    if paid.empty or not members: return pd.Series(saldo, index=members)
+
+    koszt = paid['Koszt'].to_numpy(dtype=float)
+    np.add.at(saldo, paid['Płatnik'].map(pos).to_numpy(dtype=int), koszt)
+
+    # Najczęstszy przypadek "wszyscy" liczymy jednym odejmowaniem, resztę przez listy indeksów
+    lists = paid['Uczestnicy'].map(lambda v: [pos[n] for n in split_names(v) if n in pos])
+    counts = lists.map(len).to_numpy()
+    everyone = counts == 0
+    saldo -= koszt[everyone].sum() / len(members)
+    if (~everyone).any():
+        flat = np.fromiter((i for idx in lists[~everyone] for i in idx), dtype=int, count=int(counts[~everyone].sum()))
+        np.add.at(saldo, flat, -np.repeat(koszt[~everyone] / counts[~everyone], counts[~everyone]))
+    return pd.Series(saldo, index=members)
+
+
+def settle(saldo, eps=0.005):
+    # Min-cash-flow: największy dłużnik oddaje największemu wierzycielowi, aż salda się wyzerują.
+    # Kopce -> O(n log n); każdy przelew zamyka co najmniej jedno saldo, więc przelewów jest < n.
+    creditors = [(-amount, name) for name, amount in saldo.items() if amount > eps]
+    debtors = [(amount, name) for name, amount in saldo.items() if amount < -eps]
+    heapq.heapify(creditors); heapq.heapify(debtors)
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor, creditor, round(amount, 2)))
+        if -credit - amount > eps: heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt - amount > eps: heapq.heappush(debtors, (debt + amount, debtor))
+    return pd.DataFrame(transfers, columns=['Od', 'Do', 'Kwota'])
+
+
+# ==========================================
+# 🧮 SCENARIUSZE "CO JEŚLI?" (BEZ ZAPISU)
+# ==========================================
+def scenario_grid(base_shared, individual, distance, prices, consumptions, cars, people):
+    # Cała siatka parametrów w jednym przebiegu numpy: cena x spalanie x auta x osoby.
+    # Wartości bez powtórzeń - suwak zwinięty do jednej wartości nie może dać zdublowanych wierszy
+    P, C, A, N = np.meshgrid(np.unique(np.asarray(prices, dtype=float)), np.unique(np.asarray(consumptions, dtype=float)),
+                             np.unique(np.asarray(cars, dtype=int)), np.unique(np.asarray(people, dtype=int)), indexing='ij')
+    paliwo = A * (distance / 100) * C * P
+    return pd.DataFrame({
+        'Cena paliwa': P.ravel(), 'Spalanie': C.ravel(), 'Auta': A.ravel(), 'Osoby': N.ravel(),
+        'Paliwo': paliwo.ravel(), 'Wspólne': (base_shared + paliwo).ravel(),
+        'Na osobę': (individual + (base_shared + paliwo) / N).ravel(),
+    })
+
+
+PARAMETRY_SCENARIUSZA = ['Cena paliwa', 'Spalanie', 'Auta', 'Osoby']
+
+
+def sensitivity(grid):
+    # Wrażliwość: rozpiętość kosztu na osobę, gdy zmienia się jeden parametr, a reszta stoi w środku zakresu
+    middle = {col: np.sort(grid[col].unique())[len(grid[col].unique()) // 2] for col in PARAMETRY_SCENARIUSZA}
+    rows = []
+    for col in PARAMETRY_SCENARIUSZA:
+        others = np.logical_and.reduce([grid[o].to_numpy() == middle[o] for o in PARAMETRY_SCENARIUSZA if o != col])
+        values = grid.loc[others, 'Na osobę']
+        rows.append({'Parametr': col, 'Min': values.min(), 'Max': values.max(), 'Rozpiętość': values.max() - values.min()})
+    return pd.DataFrame(rows).sort_values(by='Rozpiętość', ascending=False, ignore_index=True)
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# ==========================================
+# 🩺 DIAGNOSTYKA (WŁĄCZANA NA ŻĄDANIE)
+# ==========================================
+# Czasy sekcji jednego przebiegu skryptu, wywołania backendu, zapytania do GitHuba
+# i trafienia w cache. Wyłączony profiler nic nie mierzy (nullcontext).
+logger = logging.getLogger("planer.diagnostics")
+
+
+def diagnostics_settings(secrets, environ=os.environ):
+    settings = dict(secrets.get("diagnostics", {})) if secrets else {}
+    if environ.get("PLANER_DIAGNOSTICS"): settings["enabled"] = environ["PLANER_DIAGNOSTICS"].lower() not in ("0", "false", "no")
+    if environ.get("PLANER_METRICS_FILE"): settings["prometheus_file"] = environ["PLANER_METRICS_FILE"]
+    settings.setdefault("enabled", False)
+    settings.setdefault("log", True)
+    settings.setdefault("prometheus_file", None)
+    return settings
+
+
+class TimedStorage:
+    # Pośrednik mierzący wywołania backendu; reszta atrybutów przechodzi bez zmian
+    TIMED = {"read", "write", "append", "delete", "exists", "commit", "write_merged", "version", "flush"}
+
+    def __init__(self, storage, profiler):
+        self._storage = storage
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        attr = getattr(self._storage, name)
+        if name not in self.TIMED: return attr
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            with self._profiler.section(f"storage.{name}"): return attr(*args, **kwargs)
+        return call
+
+
+class Profiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.sections = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._api_start = {}
+        self._api_source = None
+        self._caches = {}
+
+    def section(self, name):
+        return self._timed(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _timed(self, name):
+        t0 = time.perf_counter()
+        try: yield
+        finally:
+            self.sections[name] += time.perf_counter() - t0
+            self.calls[name] += 1
+
+    def timed(self, name):
+        # Dekorator, np. pod @st.dialog - czas liczony przy każdym wywołaniu
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.section(name): return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def wrap_storage(self, storage):
+        if not self.enabled or storage is None: return storage
+        self._api_source = storage
+        self._api_start = storage.api_stats()
+        return TimedStorage(storage, self)
+
+    def watch_cache(self, name, cache):
+        # Obiekt z licznikami hits / misses; w raporcie przyrost w tym przebiegu i skumulowany odsetek trafień
+        if self.enabled and cache is not None: self._caches[name] = (cache, cache.hits, cache.misses)
+
+    def report(self):
+        api = self._api_source.api_stats() if self._api_source is not None else {}
+        caches = {}
+        for name, (cache, hits0, misses0) in self._caches.items():
+            total = cache.hits + cache.misses
+            caches[name] = {"hits": cache.hits - hits0, "misses": cache.misses - misses0,
+                            "hit_rate": round(cache.hits / total, 3) if total else None}
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "sections": {name: {"ms": round(sec * 1000, 2), "calls": self.calls[name]}
+                         for name, sec in sorted(self.sections.items(), key=lambda kv: -kv[1])},
+            "github": {key: value - self._api_start.get(key, 0) for key, value in api.items() if value != self._api_start.get(key, 0)},
+            "caches": caches,
+        }
+
+
+# --- METRYKI PROCESU (PROMETHEUS) ---
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    # Sumy ze wszystkich sesji procesu; zapisywane jako plik tekstowy dla node_exporter (textfile collector)
+    def __init__(self):
+        self.reruns = 0
+        self.rerun_seconds = 0.0
+        self.last_rerun_seconds = 0.0
+        self.section_seconds = defaultdict(float)
+        self.section_calls = defaultdict(int)
+        self.cache_hits = defaultdict(int)
+        self.cache_misses = defaultdict(int)
+        self.github = {}
+        self._lock = threading.Lock()
+
+    def observe(self, report, github_totals=None):
+        with self._lock:
+            self.reruns += 1
+            self.last_rerun_seconds = report["total_ms"] / 1000
+            self.rerun_seconds += self.last_rerun_seconds
+            for name, sec in report["sections"].items():
+                self.section_seconds[name] += sec["ms"] / 1000
+                self.section_calls[name] += sec["calls"]
+            for name, cache in report["caches"].items():
+                self.cache_hits[name] += cache["hits"]
+                self.cache_misses[name] += cache["misses"]
+            if github_totals is not None: self.github = dict(github_totals)
+
+    def prometheus(self):
+        with self._lock:
+            lines = [
+                "# HELP planer_reruns_total Przebiegi skryptu z włączoną diagnostyką",
+                "# TYPE planer_reruns_total counter", f"planer_reruns_total {self.reruns}",
+                "# TYPE planer_rerun_seconds_total counter", f"planer_rerun_seconds_total {self.rerun_seconds:.6f}",
+                "# TYPE planer_rerun_last_seconds gauge", f"planer_rerun_last_seconds {self.last_rerun_seconds:.6f}",
+                "# TYPE planer_section_seconds_total counter",
+            ]
+            lines += [f'planer_section_seconds_total{{section="{_label(n)}"}} {s:.6f}' for n, s in sorted(self.section_seconds.items())]
+            lines.append("# TYPE planer_section_calls_total counter")
+            lines += [f'planer_section_calls_total{{section="{_label(n)}"}} {c}' for n, c in sorted(self.section_calls.items())]
+            lines.append("# TYPE planer_cache_requests_total counter")
+            for name in sorted(set(self.cache_hits) | set(self.cache_misses)):
+                lines.append(f'planer_cache_requests_total{{cache="{_label(name)}",result="hit"}} {self.cache_hits[name]}')
+                lines.append(f'planer_cache_requests_total{{cache="{_label(name)}",result="miss"}} {self.cache_misses[name]}')
+            calls = {k: v for k, v in self.github.items() if not k.startswith("bytes_")}
+            lines.append("# TYPE planer_github_api_calls_total counter")
+            lines += [f'planer_github_api_calls_total{{kind="{_label(k)}"}} {v}' for k, v in sorted(calls.items())]
+            lines.append("# TYPE planer_github_bytes_total counter")
+            lines += [f'planer_github_bytes_total{{direction="{k[6:]}"}} {v}' for k, v in sorted(self.github.items()) if k.startswith("bytes_")]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Zapis atomowy: kolektor nigdy nie czyta połowy pliku
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+def log_report(report, **context):
+    logger.info(json.dumps({"event": "rerun", **context, **report}, ensure_ascii=False))
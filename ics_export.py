@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from scheduling import event_bounds
+
+# ==========================================
+# 📅 EKSPORT ICS
+# ==========================================
+PRODID = "-//ZwariowanaPrzygoda//PL"
+UID_DOMAIN = "zwariowana-przygoda"
+ICS_FORMAT = '%Y%m%dT%H%M%S'
+
+
+def _escape(values):
+    # RFC 5545: w tekście trzeba poprzedzić \ znaki \ ; , oraz zamienić nowe linie
+    return (values.astype(str).str.replace("\\", "\\\\", regex=False).str.replace(";", "\\;", regex=False)
+            .str.replace(",", "\\,", regex=False).str.replace("\n", "\\n", regex=False))
+
+
+def iter_ics(events, dtstamp=None):
+    # Generator linii pliku .ics; kolumny formatowane wektorowo, pętla tylko składa wiersze.
+    # UID z ID wiersza - ponowny import aktualizuje wydarzenie zamiast je dublować.
+    dtstamp = (dtstamp or datetime.now(timezone.utc)).strftime(ICS_FORMAT) + "Z"
+    yield from ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN", "METHOD:PUBLISH"]
+
+    events = events[events['Start'].notna()]
+    if not events.empty:
+        _, end = event_bounds(events)
+        uid = events['ID'].astype(str) + f"@{UID_DOMAIN}"
+        summary = _escape(events['Tytuł'])
+        dtstart = events['Start'].dt.strftime(ICS_FORMAT)
+        dtend = pd.Series(end, index=events.index).dt.strftime(ICS_FORMAT)
+        koszt = events['Koszt'].map("Koszt: {:.0f} PLN".format)
+        opis = _escape(events['Kategoria']) + " \\n" + koszt
+
+        for row in zip(uid, summary, dtstart, dtend, opis):
+            yield "BEGIN:VEVENT"
+            yield f"UID:{row[0]}"
+            yield f"DTSTAMP:{dtstamp}"
+            yield f"SUMMARY:{row[1]}"
+            yield f"DTSTART:{row[2]}"
+            yield f"DTEND:{row[3]}"
+            yield f"DESCRIPTION:{row[4]}"
+            yield "STATUS:CONFIRMED"
+            yield "END:VEVENT"
+    yield "END:VCALENDAR"
+
+
+def build_ics(events, dtstamp=None):
+    return "\r\n".join(iter_ics(events, dtstamp)) + "\r\n"
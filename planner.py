@@ -0,0 +1,116 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from costs import CostTotals, balances, default_members, settle, split_names
+from scheduling import event_bounds
+from trip_data import apply_ops, build_views, ensure_ids, parse_data_csv, parse_journal
+
+# ==========================================
+# 🧭 RDZEŃ PLANERA (BEZ STREAMLITA)
+# ==========================================
+# Pliki wyprawy w bazie, konfiguracja, podsumowanie kosztów i kontrola spójności.
+# Import nie ma skutków ubocznych - korzysta z tego app.py i cli.py.
+REGISTRY_FILE = "registry.json"
+DEFAULT_TRIP_ID = "default"
+DEFAULT_CONFIG = {"trip_name": "Nowa Wyprawa", "start_date": "2026-06-01", "days": 7, "people": 1}
+
+
+def get_trip_files(trip_id):
+    return f"{trip_id}_data.csv", f"{trip_id}_config.json"
+
+
+def get_journal_file(trip_id):
+    return f"{trip_id}_journal.jsonl"
+
+
+def parse_config(content):
+    # Brakujący albo uszkodzony plik -> ustawienia domyślne; start_date jako date
+    try:
+        config = json.loads(content)
+        config['start_date'] = datetime.strptime(config['start_date'], "%Y-%m-%d").date()
+        config.setdefault('trip_name', DEFAULT_CONFIG['trip_name'])
+        return config
+    except Exception:
+        return {**DEFAULT_CONFIG, 'start_date': datetime.strptime(DEFAULT_CONFIG['start_date'], "%Y-%m-%d").date()}
+
+
+def trip_members(config):
+    return config.get('members') or default_members(config['people'])
+
+
+def read_registry(storage):
+    contents = storage.read(REGISTRY_FILE)
+    return json.loads(contents.content) if contents else None
+
+
+def read_trip(storage, trip_id, parse=None):
+    # -> (ramka po dzienniku, snapshot gdy dodano brakujące ID albo None, liczba wpisów dziennika).
+    # parse(sha, treść) pozwala podpiąć cache parsowania (app.py: st.cache_data).
+    data_file, _ = get_trip_files(trip_id)
+    contents = storage.read(data_file)
+    snapshot, migrated = ensure_ids(parse(contents.sha, contents.content) if parse else parse_data_csv(contents.content))
+    journal = storage.read(get_journal_file(trip_id))
+    ops = parse_journal(journal.content if journal else "")
+    return apply_ops(snapshot, ops), (snapshot if migrated else None), len(ops)
+
+
+def read_config(storage, trip_id):
+    contents = storage.read(get_trip_files(trip_id)[1])
+    return parse_config(contents.content if contents else None)
+
+
+# ==========================================
+# 📊 PODSUMOWANIE I KONTROLA SPÓJNOŚCI
+# ==========================================
+def trip_summary(df, config):
+    # Te same liczby co zakładka Podsumowanie + rozliczenie kosztów wspólnych
+    costs = CostTotals.from_frame(df)
+    views = build_views(df)
+    people = max(int(config['people']), 1)
+    members = trip_members(config)
+    saldo = balances(views.shared, members)
+    return {
+        "rows": len(df), "planned": len(views.planned), "backlog": len(views.backlog), "shared": len(views.shared),
+        "individual": round(costs.individual, 2),
+        "shared_total": round(costs.shared, 2),
+        "shared_per_person": round(costs.shared / people, 2),
+        "per_person": round(costs.individual + costs.shared / people, 2),
+        "shared_by_category": {k: round(v, 2) for k, v in sorted(costs.shared_by_category.items())},
+        "transfers": settle(saldo).to_dict('records'),
+        "unassigned": round(float(views.shared.loc[~views.shared['Płatnik'].isin(members), 'Koszt'].sum()), 2),
+    }
+
+
+def check_trip(df, config):
+    # -> lista problemów "opis (liczba wierszy)"; pusta = wyprawa spójna
+    issues = []
+
+    def report(mask, message):
+        count = int(np.count_nonzero(mask))
+        if count: issues.append(f"{message} ({count})")
+
+    ids = df['ID'].astype(str)
+    report(ids == "", "wiersze bez ID")
+    report(ids.duplicated() & (ids != ""), "powtórzone ID")
+    report((df['Koszt'] < 0) | (df['Czas (h)'] < 0), "ujemny koszt lub czas")
+    report(df['Zaplanowane'] & df['Start'].isna() & (df['Typ_Kosztu'] == 'Indywidualny'), "zaplanowane bez godziny startu")
+    report(df['Koniec'].notna() & df['Start'].notna() & (df['Koniec'] < df['Start']), "koniec przed startem")
+
+    views = build_views(df)
+    planned = views.planned
+    if not planned.empty:
+        first = pd.Timestamp(config['start_date'])
+        last = first + timedelta(days=int(config['days']))
+        start, end = event_bounds(planned)
+        report((start < first.to_datetime64()) | (start >= last.to_datetime64()), "wydarzenia poza dniami wyjazdu")
+        # Posortowane po Start: kolizja, gdy start wypada przed najpóźniejszym końcem wcześniejszych wydarzeń
+        report(start[1:] < np.maximum.accumulate(end)[:-1], "nakładające się wydarzenia")
+
+    shared = views.shared
+    members = set(trip_members(config))
+    report(shared['Płatnik'].ne("") & ~shared['Płatnik'].isin(members), "płatnik spoza listy uczestników")
+    report(shared['Uczestnicy'].map(lambda v: any(n not in members for n in split_names(v))), "nieznani uczestnicy kosztu")
+    return issues
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# 🕛 CIĘCIE WYDARZEŃ PRZEZ PÓŁNOC
+# ==========================================
+ONE_DAY = np.timedelta64(1, 'D')
+ONE_SECOND = np.timedelta64(1, 's')
+
+
+def day_labels(days):
+    # Etykiety kolumn kalendarza; strftime tylko raz na unikalny dzień
+    days = pd.DatetimeIndex(days)
+    unique = days.unique()
+    return pd.Series(unique.strftime('%d.%m %A'), index=unique).reindex(days).to_numpy()
+
+
+def split_at_midnight(events):
+    # Każde wydarzenie -> tyle segmentów, ile dni obejmuje. Segmenty pośrednie
+    # trwają 00:00-23:59:59, pierwszy zaczyna się o Start, ostatni kończy o Koniec.
+    # Zakończenie równo o północy nie tworzy pustego segmentu następnego dnia.
+    if events.empty: return events.assign(Day_Label=pd.Series(dtype=object))
+
+    start = events['Start'].to_numpy()
+    end = events['Koniec'].to_numpy()
+    fallback_end = start + (events['Czas (h)'].to_numpy(dtype=float) * 3600).astype('timedelta64[s]')
+    end = np.where(np.isnat(end), fallback_end, end)
+    end = np.maximum(end, start)
+
+    first_day = start.astype('datetime64[D]')
+    last_day = np.where(end > start, (end - ONE_SECOND).astype('datetime64[D]'), first_day)
+    counts = (last_day - first_day).astype(int) + 1
+
+    rows = np.repeat(np.arange(len(events)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    seg_day = first_day[rows] + offsets * ONE_DAY
+
+    df_chart = events.iloc[rows].copy()
+    df_chart['Start'] = np.maximum(start[rows], seg_day.astype(start.dtype))
+    df_chart['Koniec'] = np.minimum(end[rows], (seg_day + ONE_DAY - ONE_SECOND).astype(end.dtype))
+    df_chart['Day_Label'] = day_labels(seg_day)
+    return df_chart.reset_index(drop=True)
+
+
+# ==========================================
+# 📏 INDEKS PRZEDZIAŁÓW (KOLIZJE W KALENDARZU)
+# ==========================================
+# Wydarzenia posortowane po Start + prefiksowe maksimum Koniec: zakres kandydatów
+# do kolizji wyznaczają dwa wyszukiwania binarne (O(log n)).
+def event_bounds(events):
+    start = events['Start'].to_numpy()
+    end = events['Koniec'].to_numpy()
+    fallback_end = start + (events['Czas (h)'].to_numpy(dtype=float) * 3600).astype('timedelta64[s]')
+    end = np.where(np.isnat(end), fallback_end, end)
+    return start, np.maximum(end, start)
+
+
+class IntervalIndex:
+    def __init__(self, starts, ends, ids):
+        order = np.argsort(starts, kind='stable')
+        self.starts = np.asarray(starts)[order]
+        self.ends = np.asarray(ends)[order].astype(self.starts.dtype)
+        self.ids = np.asarray(ids)[order]
+        self.max_end = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+        self._merged = None
+
+    @classmethod
+    def from_events(cls, events):
+        start, end = event_bounds(events)
+        return cls(start, end, events['ID'].to_numpy())
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _ts(self, value):
+        return np.datetime64(pd.Timestamp(value)).astype(self.starts.dtype)
+
+    def overlaps(self, start, end, exclude=None):
+        # ID wydarzeń, które nachodzą na [start, end) (styk końca z początkiem to nie kolizja)
+        if not len(self): return []
+        start, end = self._ts(start), self._ts(end)
+        lo = np.searchsorted(self.max_end, start, side='right')
+        hi = np.searchsorted(self.starts, end, side='left')
+        hits = self.ids[lo:hi][self.ends[lo:hi] > start]
+        return [i for i in hits if i != exclude]
+
+    def merged(self):
+        # Suma zajętych przedziałów jako rozłączne bloki (start, koniec)
+        if self._merged is None:
+            if not len(self):
+                self._merged = (self.starts, self.ends)
+            else:
+                breaks = np.concatenate([[True], self.starts[1:] > self.max_end[:-1]])
+                first = np.flatnonzero(breaks)
+                last = np.concatenate([first[1:] - 1, [len(self.starts) - 1]])
+                self._merged = (self.starts[first], self.max_end[last])
+        return self._merged
+
+    def nearest_free(self, start, duration, window_start, window_end, step=np.timedelta64(1, 'h')):
+        # Najbliższy początek (wyrównany do `step`), od którego mieści się `duration` bez kolizji
+        start, window_start, window_end = self._ts(start), self._ts(window_start), self._ts(window_end)
+        duration = np.timedelta64(pd.Timedelta(duration)).astype('timedelta64[s]')
+        step = step.astype('timedelta64[s]')
+        busy_start, busy_end = self.merged()
+        gap_start = np.maximum(np.concatenate([[window_start], busy_end]), window_start)
+        gap_end = np.minimum(np.concatenate([busy_start, [window_end]]), window_end)
+        latest = gap_end - duration
+
+        wanted = np.clip(start, gap_start, np.maximum(latest, gap_start))
+        epoch = np.datetime64(0, 's').astype(self.starts.dtype)
+        offset = (wanted - epoch).astype('timedelta64[s]')
+        floor = epoch + (offset // step) * step
+        ceil = floor + np.where(offset % step == np.timedelta64(0, 's'), np.timedelta64(0, 's'), step)
+
+        best, best_dist = None, None
+        for candidates in (floor, ceil):
+            ok = (candidates >= gap_start) & (candidates <= latest)
+            if not ok.any(): continue
+            dist = np.abs((candidates[ok] - start).astype('timedelta64[s]').astype(np.int64))
+            i = int(np.argmin(dist))
+            if best_dist is None or dist[i] < best_dist: best, best_dist = candidates[ok][i], dist[i]
+        return None if best is None else pd.Timestamp(best).to_pydatetime()
+
+
+# ==========================================
+# 🪄 AUTO-PLAN: POCZEKALNIA -> WOLNE GODZINY
+# ==========================================
+# Siatka godzinowa całego wyjazdu (dni * 24). Zajęte godziny z planu są blokowane,
+# każda kategoria ma swoje dozwolone godziny, zawsze przycięte do godzin aktywności.
+# Najdłuższe pozycje idą pierwsze; spośród pasujących startów wybieramy dzień
+# z najmniejszym obciążeniem, a w nim najwcześniejszą godzinę.
+REGULY_KATEGORII = {
+    "Atrakcja": [(9, 19)],
+    "Jedzenie": [(12, 15), (18, 21)],
+    "Impreza": [(19, 24)],
+    "Sport/Rekreacja": [(8, 18)],
+}
+
+
+def _hour_mask(ranges, days):
+    mask = np.zeros(24, dtype=bool)
+    for od, do in ranges:
+        if od <= do: mask[od:do] = True
+        else: mask[od:] = True; mask[:do] = True  # zakres przez północ, np. (22, 2)
+    return np.tile(mask, days)
+
+
+def busy_hours(planned, origin, hours):
+    busy = np.zeros(hours, dtype=bool)
+    if planned.empty: return busy
+    start, end = event_bounds(planned)
+    first = np.floor((start - origin) / np.timedelta64(1, 'h')).astype(int)
+    last = np.ceil((end - origin) / np.timedelta64(1, 'h')).astype(int)
+    first, last = np.clip(first, 0, hours), np.clip(last, 0, hours)
+    diff = np.zeros(hours + 1, dtype=int)
+    np.add.at(diff, first, 1)
+    np.add.at(diff, last, -1)
+    return np.cumsum(diff)[:hours] > 0
+
+
+def auto_plan(backlog, planned, start_date, days, wake_hours=(8, 22), rules=None):
+    rules = REGULY_KATEGORII if rules is None else rules
+    hours = days * 24
+    origin = np.datetime64(pd.Timestamp(start_date).normalize(), 'h')
+    free = ~busy_hours(planned, origin, hours)
+    load = (~free).reshape(days, 24).sum(axis=1)
+    default_mask = _hour_mask([wake_hours], days)
+    masks = {kat: _hour_mask(ranges, days) & default_mask for kat, ranges in rules.items()}
+
+    items = backlog.sort_values(by='Czas (h)', ascending=False, kind='stable')
+    placed, unplaced = [], []
+    for row_id, kat, czas in zip(items['ID'], items['Kategoria'], items['Czas (h)']):
+        dur = max(1, int(np.ceil(czas)))
+        allowed = free & masks.get(kat, default_mask)
+        if dur > hours:
+            unplaced.append(row_id); continue
+        cs = np.concatenate([[0], np.cumsum(allowed)])
+        starts = np.flatnonzero(cs[dur:] - cs[:-dur] == dur)
+        if not len(starts):
+            unplaced.append(row_id); continue
+        best = int(starts[np.argmin(load[starts // 24] * hours + starts)])
+        free[best:best + dur] = False
+        load[best // 24] += dur
+        placed.append((row_id, best))
+
+    proposal = items.set_index('ID').loc[[i for i, _ in placed], ['Tytuł', 'Kategoria', 'Czas (h)']].reset_index()
+    offsets = np.array([h for _, h in placed], dtype='timedelta64[h]')
+    proposal['Start'] = pd.to_datetime(origin + offsets)
+    proposal['Koniec'] = proposal['Start'] + pd.to_timedelta(proposal['Czas (h)'], unit='h')
+    return proposal.sort_values(by='Start').reset_index(drop=True), backlog[backlog['ID'].isin(unplaced)]
@@ -0,0 +1,621 @@
+import atexit
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+
+from github import Auth, Github, GithubException, GithubRetry, InputGitTreeElement
+
+# ==========================================
+# 💾 WARSTWA ZAPISU (GITHUB / LOKALNIE)
+# ==========================================
+# Aplikacja rozmawia tylko z obiektem Storage: read / write / delete.
+# Backend wybierany jest w sekcji [storage] w st.secrets albo zmienną
+# środowiskową PLANER_STORAGE ("github" / "local").
+
+
+class ConflictError(Exception):
+    # Ktoś zmienił plik od wersji, na której opieraliśmy zapis
+    def __init__(self, paths):
+        super().__init__(f"Konflikt wersji: {', '.join(sorted(paths))}")
+        self.paths = paths
+
+
+@dataclass
+class StoredFile:
+    path: str
+    content: str
+    sha: str
+
+
+def blob_sha(content):
+    # Ten sam SHA co `git hash-object` - lokalny backend liczy go identycznie jak GitHub
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class Storage:
+    label = "Storage"
+
+    def read(self, path):
+        raise NotImplementedError
+
+    def write(self, path, content, message="Update"):
+        raise NotImplementedError
+
+    def delete(self, path, message="Delete"):
+        raise NotImplementedError
+
+    def exists(self, path):
+        return self.read(path) is not None
+
+    def append(self, path, text, message="Update"):
+        stored = self.read(path)
+        return self.write(path, (stored.content if stored else "") + text, message)
+
+    def version(self, path):
+        # SHA pliku w bazie (bez buforów) albo None
+        stored = self.read(path)
+        return stored.sha if stored else None
+
+    def rate_limit(self):
+        return None
+
+    def budget_low(self):
+        # Czy backend prosi o oszczędzanie zapytań (limit API)
+        return False
+
+    def api_stats(self):
+        # Liczniki zapytań do zdalnego API od startu procesu ({rodzaj: liczba, bytes_in, bytes_out})
+        return {}
+
+    def commit(self, changes, message="Update", base=None):
+        # changes: {ścieżka: treść albo None = usuń}. Domyślnie plik po pliku.
+        # base: {ścieżka: oczekiwany SHA albo None = pliku nie ma} - zapis warunkowy
+        conflicts = [path for path, sha in (base or {}).items() if self.version(path) != sha]
+        if conflicts: raise ConflictError(conflicts)
+        shas = {}
+        for path, content in changes.items():
+            if content is None: self.delete(path, message)
+            else: shas[path] = self.write(path, content, message)
+        return shas
+
+    def write_merged(self, paths, build, message="Update", attempts=4):
+        # Optymistyczny zapis: build({ścieżka: aktualna treść albo None}) -> changes,
+        # commit tylko jeśli w międzyczasie nikt nie zmienił tych plików; inaczej czytamy i liczymy od nowa.
+        for attempt in range(attempts):
+            remote = {path: self.read(path) for path in paths}
+            changes = build({path: f.content if f else None for path, f in remote.items()})
+            try:
+                return self.commit(changes, message, base={path: f.sha if f else None for path, f in remote.items()})
+            except ConflictError:
+                if attempt == attempts - 1: raise
+                time.sleep(conflict_pause(attempt))
+
+
+def conflict_pause(attempt):
+    # Losowy odstęp po konflikcie - kilka sesji naraz nie ponawia zapisu w tym samym momencie
+    return random.uniform(0.1, 0.5) * 2 ** attempt
+
+
+# ==========================================
+# 🧠 CACHE ODCZYTÓW (PATH + SHA)
+# ==========================================
+# Treść pliku o danym SHA nigdy się nie zmienia, więc można ją trzymać bez TTL -
+# ograniczamy tylko łączny rozmiar (LRU po bajtach).
+class ReadCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, sha):
+        with self._lock:
+            content = self._items.get((path, sha))
+            if content is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end((path, sha))
+            self.hits += 1
+            return content
+
+    def put(self, path, sha, content):
+        with self._lock:
+            if (path, sha) in self._items: return
+            self._items[(path, sha)] = content
+            self.size += len(content)
+            while self.size > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self.size -= len(old)
+
+
+# --- KLIENT GITHUB (JEDEN NA PROCES) ---
+# Sesja HTTP z pulą połączeń, ponawianie 5xx / limitów wtórnych z wykładniczym
+# odstępem (GithubRetry respektuje też nagłówek Retry-After). Na reset limitu czekamy
+# najwyżej `rate_limit_wait` sekund - dłużej zapytanie kończy się błędem, a aplikacja
+# serwuje dane z cache (odczyty) albo ponawia zapis później (BufferedStorage).
+def create_github_client(token, retries=5, backoff=0.5, pool_size=10, timeout=15, rate_limit_wait=10):
+    retry = GithubRetry(total=retries, backoff_factor=backoff, secondary_rate_wait=rate_limit_wait, max_rate_limit_wait=rate_limit_wait)
+    return Github(auth=Auth.Token(token), retry=retry, pool_size=pool_size, timeout=timeout)
+
+
+class GitHubStorage(Storage):
+    label = "GitHub Repository"
+
+    def __init__(self, repo, cache_ttl=30.0, cache=None, rate_reserve=100):
+        self.repo = repo
+        self.cache_ttl = cache_ttl
+        self.cache = cache or ReadCache()
+        self.rate_reserve = rate_reserve
+        self.stale = False
+        self._tree = None
+        self._tree_etag = None
+        self._tree_checked = 0.0
+        self._lock = threading.RLock()
+        self.api = Counter()
+
+    def _count(self, kind, bytes_in=0, bytes_out=0):
+        with self._lock:
+            self.api[kind] += 1
+            self.api["bytes_in"] += bytes_in
+            self.api["bytes_out"] += bytes_out
+
+    def api_stats(self):
+        with self._lock: return dict(self.api)
+
+    def rate_limit(self):
+        # Z nagłówków X-RateLimit-* ostatniej odpowiedzi - bez dodatkowego zapytania
+        remaining, limit = self.repo.requester.rate_limiting
+        if remaining < 0: return None
+        return {"remaining": remaining, "limit": limit, "reset": self.repo.requester.rate_limiting_resettime}
+
+    def budget_low(self):
+        limits = self.rate_limit()
+        return limits is not None and limits["remaining"] < self.rate_reserve and time.time() < limits["reset"]
+
+    def _tree_shas(self):
+        # Lista plików gałęzi {ścieżka: sha}. W ramach TTL - zero zapytań,
+        # potem zapytanie warunkowe z ETag (304 nie zużywa limitu API).
+        # Przy wyczerpanym limicie albo awarii GitHuba serwujemy ostatnią znaną wersję.
+        with self._lock:
+            if self._tree is not None and time.monotonic() - self._tree_checked < self.cache_ttl:
+                return self._tree
+            if self._tree is not None and self.budget_low():
+                self.stale = True
+                return self._tree
+            url = f"{self.repo.url}/git/trees/{self.repo.default_branch}"
+            headers = {"If-None-Match": self._tree_etag} if self._tree_etag and self._tree is not None else {}
+            try:
+                status, resp_headers, output = self.repo.requester.requestJson("GET", url, parameters={"recursive": "1"}, headers=headers)
+                self._count("tree_304" if status == 304 else "tree", bytes_in=len(output or ""))
+            except Exception:
+                if self._tree is None: raise
+                self.stale = True
+                return self._tree
+            self.stale = False
+            if status == 304:
+                self._tree_checked = time.monotonic()
+                return self._tree
+            if status >= 400:
+                raise GithubException(status, output, resp_headers)
+            data = json.loads(output)
+            self._tree = {el["path"]: el["sha"] for el in data["tree"] if el["type"] == "blob"}
+            self._tree_etag = resp_headers.get("etag")
+            self._tree_checked = time.monotonic()
+            return self._tree
+
+    def _remember(self, path, sha, content):
+        with self._lock:
+            if self._tree is not None:
+                if sha is None: self._tree.pop(path, None)
+                else: self._tree[path] = sha
+        if sha is not None: self.cache.put(path, sha, content)
+
+    def version(self, path):
+        return self._tree_shas().get(path)
+
+    def read(self, path):
+        sha = self._tree_shas().get(path)
+        if sha is None: return None
+        content = self.cache.get(path, sha)
+        if content is None:
+            blob = self.repo.get_git_blob(sha).content
+            self._count("blob", bytes_in=len(blob))
+            content = base64.b64decode(blob).decode("utf-8")
+            self.cache.put(path, sha, content)
+        return StoredFile(path, content, sha)
+
+    def write(self, path, content, message="Update"):
+        sha = self._tree_shas().get(path)
+        if sha is None:
+            result = self.repo.create_file(path, message, content)
+        else:
+            result = self.repo.update_file(path, message, content, sha)
+        self._count("contents_write", bytes_out=len(content.encode("utf-8")))
+        new_sha = result["content"].sha
+        self._remember(path, new_sha, content)
+        return new_sha
+
+    def delete(self, path, message="Delete"):
+        sha = self._tree_shas().get(path)
+        if sha is None: return False
+        self.repo.delete_file(path, message, sha)
+        self._count("contents_delete")
+        self._remember(path, None, None)
+        return True
+
+    def commit(self, changes, message="Update", base=None):
+        # Wszystkie zmiany jako JEDEN commit przez Git Data API (tree + commit + ref).
+        # Z `base` commit przechodzi tylko, jeśli pliki na gałęzi mają oczekiwane SHA.
+        ref = self.repo.get_git_ref(f"heads/{self.repo.default_branch}")
+        self._count("git_ref")
+        for attempt in range(3):
+            parent = self.repo.get_git_commit(ref.object.sha)
+            existing = {el.path: el.sha for el in self.repo.get_git_tree(parent.tree.sha, recursive=True).tree if el.type == "blob"}
+            self._count("git_commit"); self._count("git_tree")
+            conflicts = [path for path, sha in (base or {}).items() if existing.get(path) != sha]
+            if conflicts:
+                # Świeże drzewo od razu do cache - ponowny odczyt zobaczy nową wersję bez czekania na TTL
+                with self._lock:
+                    self._tree, self._tree_checked = dict(existing), time.monotonic()
+                raise ConflictError(conflicts)
+            elements = []
+            for path, content in changes.items():
+                if content is None:
+                    if path in existing: elements.append(InputGitTreeElement(path, "100644", "blob", sha=None))
+                else:
+                    elements.append(InputGitTreeElement(path, "100644", "blob", content=content))
+            if not elements: return {}
+            tree = self.repo.create_git_tree(elements, parent.tree)
+            self._count("git_create_tree", bytes_out=sum(len(c.encode("utf-8")) for c in changes.values() if c is not None))
+            new_commit = self.repo.create_git_commit(message, tree, [parent])
+            self._count("git_create_commit")
+            try:
+                self._count("git_ref_update")
+                ref.edit(new_commit.sha)
+            except GithubException as e:
+                # Ktoś zdążył zrobić commit w międzyczasie - budujemy drzewo od nowa
+                if e.status != 422 or attempt == 2: raise
+                ref = self.repo.get_git_ref(f"heads/{self.repo.default_branch}")
+                self._count("git_ref")
+                continue
+            shas = {el.path: el.sha for el in tree.tree if el.path in changes}
+            for path, content in changes.items(): self._remember(path, shas.get(path), content)
+            return shas
+
+
+class LocalStorage(Storage):
+    label = "Katalog lokalny"
+    _commit_lock = threading.Lock()  # sprawdzenie SHA i zapis jako jedna operacja w procesie
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def commit(self, changes, message="Update", base=None):
+        with self._commit_lock:
+            return super().commit(changes, message, base)
+
+    def _full_path(self, path):
+        full = os.path.abspath(os.path.join(self.root, path))
+        if os.path.commonpath([full, self.root]) != self.root:
+            raise ValueError(f"Ścieżka poza katalogiem danych: {path}")
+        return full
+
+    def read(self, path):
+        try:
+            with open(self._full_path(path), "r", encoding="utf-8", newline="") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        return StoredFile(path, content, blob_sha(content))
+
+    def write(self, path, content, message="Update"):
+        full = self._full_path(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        tmp = f"{full}.tmp"
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        os.replace(tmp, full)
+        return blob_sha(content)
+
+    def delete(self, path, message="Delete"):
+        try:
+            os.remove(self._full_path(path))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+# ==========================================
+# ⏳ WRITE-BEHIND: ŁĄCZENIE ZMIAN W JEDEN COMMIT
+# ==========================================
+# Zmiany trafiają najpierw do bufora (odczyty widzą je od razu), a do backendu
+# idą jednym commitem po `delay` sekundach ciszy (najpóźniej po `max_wait`)
+# albo po ręcznym "Synchronizuj".
+_REMOTE = object()  # znacznik: plik w wersji z bazy (bez zakolejkowanej treści)
+
+
+class BufferedStorage(Storage):
+    # Zapis w tle: zmiany trafiają do bufora od razu, a commit robi wątek timera.
+    # Nieudany commit zostaje w buforze i jest ponawiany z rosnącym odstępem.
+    def __init__(self, inner, delay=10.0, max_wait=60.0, max_backoff=300.0, conflict_retries=4):
+        self.inner = inner
+        self.label = inner.label
+        self.delay = delay
+        self.max_wait = max_wait
+        self.max_backoff = max_backoff
+        self.conflict_retries = conflict_retries
+        self.last_error = None
+        self.deferred_until = None
+        self.failures = 0
+        self.retry_at = None
+        self.in_flight = []
+        self._pending = {}
+        self._appends = {}
+        self._merges = []   # (ścieżki, build, zmiany sprzed scalenia) - liczone w wątku zapisu
+        self._conditions = {}   # {ścieżka: SHA w bazie, na którym oparto zakolejkowany zapis warunkowy}
+        self.rejected = []
+        self._messages = []
+        self._first_change = None
+        self._timer = None
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def read(self, path):
+        with self._lock:
+            tail = "".join(self._appends.get(path, []))
+            if path in self._pending:
+                content = self._pending[path]
+                return None if content is None else StoredFile(path, content, blob_sha(content))
+            merges = list(self._merges)
+        if any(path in paths for paths, _, _ in merges):
+            # Plik czeka na scalenie - liczymy je na bieżącej wersji z bazy, tak jak zrobi to wątek zapisu
+            remote = {p: self.inner.read(p) for paths, _, _ in merges for p in paths}
+            view = self._resolve({p: f.content if f else None for p, f in remote.items()}, merges, {}, {path: [tail]})
+            content = view[path]
+            return None if content is None else StoredFile(path, content, blob_sha(content))
+        stored = self.inner.read(path)
+        if not tail: return stored
+        content = (stored.content if stored else "") + tail
+        return StoredFile(path, content, blob_sha(content))
+
+    def version(self, path):
+        return self.inner.version(path)
+
+    def api_stats(self):
+        return self.inner.api_stats()
+
+    def write(self, path, content, message="Update"):
+        self._stage(path, content, message)
+        return blob_sha(content)
+
+    def append(self, path, text, message="Update"):
+        # Dopisek na koniec pliku bez czytania go teraz - zawartość bazy doczyta wątek zapisu
+        with self._lock:
+            if path in self._pending:
+                self._pending[path] = (self._pending[path] or "") + text
+            else:
+                self._appends.setdefault(path, []).append(text)
+            self._note(message)
+        self._schedule()
+
+    def write_merged(self, paths, build, message="Update"):
+        # Jak Storage.write_merged, ale build liczy wątek zapisu tuż przed commitem.
+        # Zmiany tych plików zakolejkowane wcześniej (także z innych sesji) wchodzą do "ich" wersji.
+        with self._lock:
+            before = {path: (self._pending.pop(path, _REMOTE), self._appends.pop(path, [])) for path in paths}
+            self._merges.append((list(paths), build, before))
+            self._note(message)
+        self._schedule()
+
+    def delete(self, path, message="Delete"):
+        existed = self.exists(path)
+        self._stage(path, None, message)
+        return existed
+
+    def commit(self, changes, message="Update", base=None):
+        # base sprawdzany od razu na widoku z kolejką, a przy wysyłce jeszcze raz na bazie -
+        # jeśli ktoś zdąży zapisać przed nami, zapis warunkowy jest odrzucany (status "rejected")
+        with self._lock:
+            for path, sha in (base or {}).items():
+                stored = self.read(path)
+                if (stored.sha if stored else None) != sha: raise ConflictError([path])
+            conditions = {path: self._conditions.get(path, self.inner.version(path)) for path in (base or {})}
+            for path, content in changes.items(): self._stage(path, content, message, schedule=False)
+            self._conditions.update(conditions)
+        self._schedule()
+        return {path: blob_sha(c) for path, c in changes.items() if c is not None}
+
+    def _queued(self):
+        return set(self._pending) | set(self._appends) | {p for paths, _, _ in self._merges for p in paths}
+
+    def pending_paths(self):
+        with self._lock: return sorted(self._queued())
+
+    def status(self):
+        # Stan kolejki do nagłówka aplikacji
+        with self._lock:
+            return {
+                "queued": sorted(self._queued() - set(self.in_flight)),
+                "in_flight": list(self.in_flight),
+                "failed": str(self.last_error) if self.last_error else None,
+                "rejected": list(self.rejected),
+                "failures": self.failures,
+                "retry_at": self.retry_at,
+                "deferred_until": self.deferred_until,
+            }
+
+    def _note(self, message):
+        if message not in self._messages: self._messages.append(message)
+        if self._first_change is None: self._first_change = time.monotonic()
+
+    def _stage(self, path, content, message, schedule=True):
+        with self._lock:
+            self._pending[path] = content
+            self._appends.pop(path, None)  # pełny zapis / usunięcie zastępuje wcześniejsze dopiski
+            self._conditions.pop(path, None)
+            self._note(message)
+        if schedule: self._schedule()
+
+    def _schedule(self):
+        if self.delay <= 0:
+            self.flush()
+            if self.last_error: raise self.last_error
+            if self.rejected: raise ConflictError(self.rejected)
+            return
+        with self._lock:
+            if self.retry_at: return  # po błędzie czekamy na zaplanowaną ponowną próbę
+            if self._timer: self._timer.cancel()
+            waited = time.monotonic() - (self._first_change or time.monotonic())
+            self._timer = threading.Timer(max(0.0, min(self.delay, self.max_wait - waited)), self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def rate_limit(self):
+        return self.inner.rate_limit()
+
+    def budget_low(self):
+        return self.inner.budget_low()
+
+    def _retry_later(self, delay):
+        with self._lock:
+            if self._timer: self._timer.cancel()
+            self.retry_at = time.time() + delay
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @staticmethod
+    def _resolve(remote, merges, pending, appends):
+        # Treść plików po zakolejkowanych zmianach: scalenia po kolei, potem pełne zapisy i dopiski
+        view = dict(remote)
+        for paths, build, before in merges:
+            for path in paths:
+                content, chunks = before[path]
+                if content is not _REMOTE: view[path] = content
+                if chunks: view[path] = (view[path] or "") + "".join(chunks)
+            view.update(build({path: view[path] for path in paths}))
+        view.update(pending)
+        for path, chunks in appends.items():
+            if chunks: view[path] = (view.get(path) or "") + "".join(chunks)
+        return view
+
+    def flush(self, force=False):
+        # Jeden commit naraz; kolejne wywołania czekają, aż poprzedni się skończy
+        with self._flush_lock:
+            return self._flush(force)
+
+    def _flush(self, force):
+        with self._lock:
+            if self._timer: self._timer.cancel(); self._timer = None
+            self.retry_at = None
+            if not self._queued(): return True
+            if not force and self.inner.budget_low():
+                # Zostawiamy rezerwę limitu na odczyty - zapis poczeka do resetu
+                reset = self.inner.rate_limit()["reset"]
+                self.deferred_until = reset
+                self._retry_later(max(reset - time.time(), self.delay, 5.0))
+                return False
+            self.deferred_until = None
+            staged = dict(self._pending)
+            conditions = dict(self._conditions)
+            appends = {path: list(chunks) for path, chunks in self._appends.items()}
+            merges = list(self._merges)
+            to_read = set(appends) | {p for paths, _, _ in merges for p in paths}
+            touched = sorted(set(staged) | to_read)
+            message = "; ".join(self._messages) + f" ({len(touched)} plików)"
+            self.in_flight = touched
+        pending, rejected = dict(staged), []
+        try:
+            # Dopiski i scalenia liczone na świeżej wersji; commit warunkowy po SHA tej wersji.
+            # Konflikt = ktoś zdążył zapisać w międzyczasie: czytamy jeszcze raz i liczymy od nowa.
+            # Zapisu warunkowego nie da się policzyć od nowa - odrzucamy go, a resztę wysyłamy.
+            attempt = 0
+            while True:
+                remote = {path: self.inner.read(path) for path in to_read}
+                view = self._resolve({p: f.content if f else None for p, f in remote.items()}, merges, pending, appends)
+                try:
+                    shas = self.inner.commit({path: view[path] for path in touched}, message,
+                                             base={**{p: f.sha if f else None for p, f in remote.items()}, **conditions})
+                    break
+                except ConflictError as e:
+                    stale = [path for path in e.paths if path in conditions]
+                    for path in stale:
+                        del conditions[path]
+                        if path not in to_read: pending.pop(path, None)
+                    rejected += stale
+                    touched = sorted(set(pending) | to_read)
+                    if stale: continue
+                    attempt += 1
+                    if attempt == self.conflict_retries: raise
+                    time.sleep(conflict_pause(attempt - 1))
+        except Exception as e:
+            with self._lock:
+                self.last_error = e
+                self.failures += 1
+                self.in_flight = []
+            self._retry_later(min(self.max_backoff, max(self.delay, 5.0) * 2 ** (self.failures - 1)))
+            return False
+        with self._lock:
+            # Zdejmujemy tylko to, czego nikt nie nadpisał ani nie dopisał w trakcie commitu
+            for path, chunks in appends.items():
+                rest = self._appends.get(path, [])[len(chunks):]
+                if rest: self._appends[path] = rest
+                else: self._appends.pop(path, None)
+            for path, content in staged.items():
+                if path in self._pending and self._pending[path] is content: del self._pending[path]
+            for path in conditions.keys() | set(rejected):
+                # Zapis warunkowy zakolejkowany w trakcie wysyłki opiera się teraz na naszym commicie
+                if path not in self._pending: self._conditions.pop(path, None)
+                elif path in conditions: self._conditions[path] = shas.get(path)
+            del self._merges[:len(merges)]
+            if not self._queued():
+                self._messages = []
+                self._first_change = None
+            self.last_error = None
+            self.rejected = rejected
+            self.failures = 0
+            self.in_flight = []
+        if self.delay > 0 and self._queued(): self._schedule()
+        return True
+
+
+# --- WYBÓR BACKENDU ---
+def storage_settings(secrets, environ=os.environ):
+    settings = dict(secrets.get("storage", {})) if secrets else {}
+    if environ.get("PLANER_STORAGE"): settings["backend"] = environ["PLANER_STORAGE"]
+    if environ.get("PLANER_DATA_DIR"): settings["path"] = environ["PLANER_DATA_DIR"]
+    settings.setdefault("backend", "github")
+    settings.setdefault("path", "planer_data")
+    # Lokalny zapis jest tani, więc domyślnie nie czekamy z commitem
+    settings.setdefault("flush_delay", 0 if settings["backend"] == "local" else 10)
+    settings.setdefault("cache_ttl", 30)
+    settings.setdefault("retries", 5)
+    settings.setdefault("rate_reserve", 100)
+    settings.setdefault("rate_limit_wait", 10)
+    return settings
+
+
+def create_storage(settings, secrets=None):
+    backend = settings["backend"].lower()
+    if backend == "local":
+        return LocalStorage(settings["path"])
+    if backend == "github":
+        gh = create_github_client(secrets["github"]["token"], retries=int(settings["retries"]), rate_limit_wait=float(settings["rate_limit_wait"]))
+        repo = gh.get_repo(secrets["github"]["repo_name"])
+        return GitHubStorage(repo, cache_ttl=float(settings["cache_ttl"]), rate_reserve=int(settings["rate_reserve"]))
+    raise ValueError(f"Nieznany backend zapisu: {settings['backend']}")
+
+
+def create_buffered_storage(settings, secrets=None):
+    return BufferedStorage(create_storage(settings, secrets), delay=float(settings["flush_delay"]))
@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks.synthetic import START, synthetic_trip
+from charts import CHART_BUDGET_BYTES, calendar_spec, payload_bytes
+from trip_data import build_views
+
+EVENTS = 5000
+PALETA = {'bg': "#1e2630", 'text': "#faf9dd", 'accent': "#d37759", 'sec': "#4a7a96",
+          'food': "#7c8c58", 'party': "#8c5e7c", 'sport': "#e0c068"}
+
+
+def planned_events(days):
+    # ~70% wierszy syntetycznej wyprawy to wydarzenia na planie
+    planned = build_views(synthetic_trip(EVENTS * 3 // 2, days)[0]).planned
+    assert len(planned) >= EVENTS
+    return planned
+
+
+@pytest.mark.parametrize("days, window", [(7, 7), (60, 7), (60, 60)])
+def test_calendar_payload_within_budget(days, window):
+    spec = calendar_spec(planned_events(days), START, window, PALETA)
+    assert payload_bytes(spec) <= CHART_BUDGET_BYTES
@@ -0,0 +1,15 @@
+import numpy as np
+
+from costs import scenario_grid, sensitivity
+
+
+def test_scenario_grid_with_collapsed_price_range():
+    # Suwak ceny ustawiony na jedną wartość, np. (6.0, 6.0)
+    grid = scenario_grid(base_shared=1000.0, individual=200.0, distance=800, prices=np.round(np.linspace(6.0, 6.0, 4), 2),
+                         consumptions=[6.0, 8.0], cars=range(1, 3), people=range(4, 7))
+    assert len(grid) == 1 * 2 * 2 * 3
+    assert not grid.duplicated(['Cena paliwa', 'Spalanie', 'Auta', 'Osoby']).any()
+    przekroj = grid[(grid['Auta'] == 1) & (grid['Spalanie'] == 6.0)]
+    tabela = przekroj.pivot(index='Osoby', columns='Cena paliwa', values='Na osobę')
+    assert tabela.shape == (3, 1)
+    assert len(sensitivity(grid)) == 4
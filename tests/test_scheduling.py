@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from scheduling import auto_plan, split_at_midnight
+from trip_data import make_row, normalize_types
+
+
+def events(*rows):
+    # (start, koniec albo None, czas_h) -> ramka jak zaplanowane wydarzenia z bazy
+    return normalize_types(pd.DataFrame([
+        make_row(Tytuł=f"E{i}", Kategoria="Atrakcja", Start=pd.Timestamp(start), Koniec=pd.Timestamp(end) if end else None,
+                 **{'Czas (h)': hours}, Zaplanowane=True)
+        for i, (start, end, hours) in enumerate(rows)
+    ]))
+
+
+def label(day):
+    return pd.Timestamp(day).strftime('%d.%m %A')
+
+
+def segments(df):
+    return [(str(s), str(e)) for s, e in zip(df['Start'], df['Koniec'])]
+
+
+def test_no_midnight_keeps_event():
+    out = split_at_midnight(events(("2026-07-01 10:00", "2026-07-01 12:00", 2)))
+    assert segments(out) == [("2026-07-01 10:00:00", "2026-07-01 12:00:00")]
+    assert list(out['Day_Label']) == [label("2026-07-01")]
+
+
+def test_one_midnight_splits_in_two():
+    out = split_at_midnight(events(("2026-07-01 22:00", "2026-07-02 02:00", 4)))
+    assert segments(out) == [("2026-07-01 22:00:00", "2026-07-01 23:59:59"), ("2026-07-02 00:00:00", "2026-07-02 02:00:00")]
+    assert list(out['Day_Label']) == [label("2026-07-01"), label("2026-07-02")]
+    assert list(out['Tytuł']) == ["E0", "E0"]
+
+
+def test_many_midnights_fill_whole_days():
+    out = split_at_midnight(events(("2026-07-01 20:00", "2026-07-04 02:00", 54)))
+    assert segments(out) == [
+        ("2026-07-01 20:00:00", "2026-07-01 23:59:59"),
+        ("2026-07-02 00:00:00", "2026-07-02 23:59:59"),
+        ("2026-07-03 00:00:00", "2026-07-03 23:59:59"),
+        ("2026-07-04 00:00:00", "2026-07-04 02:00:00"),
+    ]
+
+
+def test_end_exactly_at_midnight_has_no_empty_next_day():
+    out = split_at_midnight(events(("2026-07-01 22:00", "2026-07-02 00:00", 2)))
+    assert segments(out) == [("2026-07-01 22:00:00", "2026-07-01 23:59:59")]
+
+
+def test_missing_end_falls_back_to_duration():
+    out = split_at_midnight(events(("2026-07-01 23:00", None, 3)))
+    assert segments(out) == [("2026-07-01 23:00:00", "2026-07-01 23:59:59"), ("2026-07-02 00:00:00", "2026-07-02 02:00:00")]
+
+
+@pytest.mark.parametrize("hours, expected", [(1, 1), (25, 2), (24 * 5 + 1, 6)])
+def test_segment_count_per_event(hours, expected):
+    start = pd.Timestamp("2026-07-01 10:00")
+    out = split_at_midnight(events(("2026-07-01 08:00", "2026-07-01 09:00", 1), (start, start + pd.Timedelta(hours=hours), hours)))
+    assert list(out['Tytuł']).count("E1") == expected
+    assert list(out['Tytuł'])[0] == "E0"
+
+
+def test_empty_frame():
+    out = split_at_midnight(events())
+    assert out.empty and 'Day_Label' in out.columns
+
+
+def test_auto_plan_keeps_category_rules_within_wake_hours():
+    backlog = normalize_types(pd.DataFrame([make_row(Tytuł=f"I{i}", Kategoria="Impreza", **{'Czas (h)': 1}) for i in range(30)]))
+    proposal, unplaced = auto_plan(backlog, events(), "2026-07-01", 7, wake_hours=(9, 21))
+    assert len(proposal) == 14 and len(unplaced) == 16  # 19-21 x 7 dni
+    assert (proposal['Start'].dt.hour >= 19).all()
+    assert (proposal['Koniec'] <= proposal['Start'].dt.normalize() + pd.Timedelta(hours=21)).all()
@@ -0,0 +1,266 @@
+import io
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from scheduling import IntervalIndex
+
+# ==========================================
+# 🗃️ MODEL DANYCH WYPRAWY
+# ==========================================
+KOLUMNY = ['ID', 'Tytuł', 'Kategoria', 'Czas (h)', 'Start', 'Koniec', 'Zaplanowane', 'Koszt', 'Typ_Kosztu', 'Płatnik', 'Uczestnicy']
+KOLUMNY_DAT = ['Start', 'Koniec']
+CSV_HEADER = ",".join(KOLUMNY) + "\n"
+
+KATEGORIE = ["Atrakcja", "Trasa", "Jedzenie", "Impreza", "Sport/Rekreacja", "Nocleg", "Wynajem Busa", "Winiety", "Inne"]
+TYPY_KOSZTU = ["Indywidualny", "Wspólny", "Paliwo"]
+TYPY_WSPOLNE = ["Wspólny", "Paliwo"]
+# Uczestnicy kosztu zapisani jako "Ala;Ola"; puste = wszyscy
+SEPARATOR_OSOB = ";"
+
+# Po tylu wpisach dziennik jest zwijany do nowego snapshotu CSV
+JOURNAL_LIMIT = 200
+
+
+def new_row_id():
+    return uuid.uuid4().hex[:12]
+
+
+def empty_frame():
+    return normalize_types(pd.DataFrame(columns=KOLUMNY))
+
+
+def _categorical(series, known):
+    values = series.fillna("").astype(str)
+    extra = sorted(set(values.unique()) - set(known))
+    return values.astype(pd.CategoricalDtype(categories=known + extra))
+
+
+def normalize_types(df):
+    # Jeden raz przy wczytaniu: bool / datetime64 / float / category zamiast mieszanki stringów
+    defaults = {'ID': "", 'Tytuł': "", 'Kategoria': "", 'Czas (h)': 0.0, 'Zaplanowane': False, 'Koszt': 0.0, 'Typ_Kosztu': 'Indywidualny', 'Płatnik': "", 'Uczestnicy': ""}
+    for col in KOLUMNY:
+        if col not in df.columns: df[col] = defaults.get(col)
+    for col in ['Tytuł', 'Płatnik', 'Uczestnicy']:
+        df[col] = df[col].fillna("").astype(str)
+    for col in ['Czas (h)', 'Koszt']:
+        if df[col].dtype != float: df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+        df[col] = df[col].fillna(0.0)
+    for col in KOLUMNY_DAT:
+        if not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col].replace("", None), errors='coerce')
+    if df['Zaplanowane'].dtype != bool:
+        df['Zaplanowane'] = df['Zaplanowane'].astype(str).str.upper() == 'TRUE'
+    if not isinstance(df['Kategoria'].dtype, pd.CategoricalDtype):
+        df['Kategoria'] = _categorical(df['Kategoria'], KATEGORIE)
+    if not isinstance(df['Typ_Kosztu'].dtype, pd.CategoricalDtype):
+        df['Typ_Kosztu'] = _categorical(df['Typ_Kosztu'].replace("", None).fillna('Indywidualny'), TYPY_KOSZTU)
+    return df[KOLUMNY + [c for c in df.columns if c not in KOLUMNY]]
+
+
+def make_row(**fields):
+    row = {'ID': new_row_id(), 'Start': None, 'Koniec': None, 'Zaplanowane': False, 'Koszt': 0.0, 'Typ_Kosztu': 'Indywidualny'}
+    row.update(fields)
+    return row
+
+
+def build_row_index(df):
+    # ID -> pozycja wiersza; przebudowywany tylko gdy zmienia się układ wierszy (add/delete)
+    return {rid: i for i, rid in enumerate(df['ID'])}
+
+
+def ensure_ids(df):
+    # Migracja starych plików bez kolumny ID - zwraca (df, czy_coś_dodano).
+    # ID z treści i pozycji wiersza: ten sam plik zawsze dostaje te same ID (stałe UID w eksporcie ICS,
+    # także gdy migracja nie zostanie zapisana, np. w cli.py)
+    if 'ID' not in df.columns: df.insert(0, 'ID', "")
+    missing = df['ID'].isna() | (df['ID'].astype(str) == "")
+    if not missing.any(): return df, False
+    df = df.copy()
+    hashes = pd.util.hash_pandas_object(df.loc[missing, [c for c in df.columns if c != 'ID']], index=True)
+    df.loc[missing, 'ID'] = [f"{h:016x}"[:12] for h in hashes]
+    return df, True
+
+
+def parse_data_csv(content):
+    df = pd.read_csv(io.StringIO(content), dtype={'ID': str})
+    return normalize_types(df)
+
+
+def to_csv(df):
+    csv_buffer = io.StringIO(); df.to_csv(csv_buffer, index=False)
+    return csv_buffer.getvalue()
+
+
+# ==========================================
+# 📒 DZIENNIK ZMIAN (APPEND-ONLY)
+# ==========================================
+# Każda edycja to jedna linia JSON: add / update / delete po ID wiersza.
+# Stan wyprawy = snapshot CSV + odtworzony dziennik.
+def op_add(row):
+    return {"op": "add", "row": row}
+
+
+def op_update(row_id, **fields):
+    return {"op": "update", "id": row_id, "fields": fields}
+
+
+def op_delete(row_id):
+    return {"op": "delete", "id": row_id}
+
+
+def _encode(value):
+    if value is None or value is pd.NaT or (isinstance(value, float) and np.isnan(value)) or value == "": return None
+    if isinstance(value, (pd.Timestamp, datetime, date)): return value.isoformat()
+    if isinstance(value, np.generic): return value.item()
+    return value
+
+
+def decode_fields(fields):
+    out = dict(fields)
+    for col in KOLUMNY_DAT:
+        if col in out: out[col] = pd.Timestamp(out[col]) if out[col] else None
+    return out
+
+
+def journal_lines(ops):
+    lines = []
+    for op in ops:
+        rec = dict(op)
+        if "row" in rec: rec["row"] = {k: _encode(v) for k, v in rec["row"].items()}
+        if "fields" in rec: rec["fields"] = {k: _encode(v) for k, v in rec["fields"].items()}
+        lines.append(json.dumps(rec, ensure_ascii=False) + "\n")
+    return "".join(lines)
+
+
+def parse_journal(content):
+    ops = []
+    for line in (content or "").splitlines():
+        if not line.strip(): continue
+        try: ops.append(json.loads(line))
+        except json.JSONDecodeError: continue  # urwana ostatnia linia - pomijamy
+    return ops
+
+
+def changes_layout(ops):
+    return any(op.get("op") != "update" for op in ops)
+
+
+def apply_ops(df, ops, positions=None):
+    if not ops: return df
+    df = df.copy()
+    if positions is None: positions = build_row_index(df)
+    col_pos = {col: i for i, col in enumerate(df.columns)}
+    added, added_pos, deleted = [], {}, set()
+
+    for op in ops:
+        kind = op.get("op")
+        if kind == "add":
+            row = decode_fields(op["row"])
+            # Ponownie odtworzony dopisek (ten sam ID) nie dubluje wiersza
+            if row['ID'] in positions or row['ID'] in added_pos: continue
+            added_pos[row['ID']] = len(added)
+            added.append(row)
+        elif kind == "update":
+            fields = decode_fields(op["fields"])
+            if op["id"] in added_pos and added[added_pos[op["id"]]] is not None:
+                added[added_pos[op["id"]]].update(fields)
+            elif op["id"] in positions:
+                i = positions[op["id"]]
+                for col, val in fields.items():
+                    if col not in col_pos:
+                        df[col] = ""; col_pos[col] = len(df.columns) - 1
+                    if isinstance(df[col].dtype, pd.CategoricalDtype) and val not in df[col].cat.categories:
+                        df[col] = df[col].cat.add_categories([val])
+                    try: df.iat[i, col_pos[col]] = val
+                    except (TypeError, ValueError):
+                        df[col] = df[col].astype(object)
+                        df.iat[i, col_pos[col]] = val
+        elif kind == "delete":
+            if op["id"] in added_pos: added[added_pos.pop(op["id"])] = None
+            elif op["id"] in positions: deleted.add(positions[op["id"]])
+
+    if deleted: df = df.drop(index=df.index[sorted(deleted)])
+    new_rows = [r for r in added if r is not None]
+    if new_rows:
+        # Nowe wiersze typujemy osobno, żeby concat nie rozmył kolumn do object
+        df = pd.concat([df, normalize_types(pd.DataFrame(new_rows))], ignore_index=True)
+        df = normalize_types(df)
+    return df.reset_index(drop=True)
+
+
+# ==========================================
+# 🔀 SCALANIE TRÓJSTRONNE (BAZA / MOJE / ICH)
+# ==========================================
+# Przy konflikcie zapisu: pole zmienione tylko po jednej stronie przechodzi,
+# pole zmienione po obu stronach na różne wartości - wygrywa "moje".
+# Usunięcie przegrywa z edycją tego samego wiersza po drugiej stronie.
+def _differs(a, b):
+    a, b = a.astype(object), b.astype(object)
+    return (a != b) & ~(a.isna() & b.isna())
+
+
+def merge_frames(base, mine, theirs):
+    # -> (scalona ramka, lista ID wierszy z konfliktem pól)
+    cols = [c for c in KOLUMNY if c != 'ID']
+    b, m, t = (normalize_types(f.copy()).set_index('ID')[cols].astype(object) for f in (base, mine, theirs))
+
+    both = t.index[t.index.isin(m.index)]
+    bb = b.reindex(both)
+    mine_changed = _differs(bb, m.loc[both])
+    theirs_changed = _differs(bb, t.loc[both])
+    merged = t.loc[both].mask(mine_changed, m.loc[both])
+    conflicts = both[(mine_changed & theirs_changed & _differs(m.loc[both], t.loc[both])).any(axis=1)]
+
+    # Wiersz tylko po jednej stronie: nowy albo usunięty przez drugą stronę
+    def survivors(side, other):
+        only = side[~side.index.isin(other.index)]
+        in_base = only.index.isin(b.index)
+        edited = _differs(b.reindex(only.index[in_base]), only[in_base]).any(axis=1).to_numpy()
+        keep = ~in_base
+        keep[in_base] = edited
+        return only[keep]
+
+    theirs_only, mine_only = survivors(t, m), survivors(m, t)
+    order = t.index[t.index.isin(merged.index) | t.index.isin(theirs_only.index)]
+    out = pd.concat([merged, theirs_only]).loc[order]
+    out = pd.concat([out, mine_only]).rename_axis('ID').reset_index()
+    return normalize_types(out), list(conflicts)
+
+
+# ==========================================
+# 🧩 WIDOKI (PARTYCJE) DANYCH
+# ==========================================
+# Liczone raz na wersję danych zamiast maski w każdej sekcji UI.
+@dataclass
+class TripViews:
+    planned: pd.DataFrame   # zaplanowane aktywności, posortowane po Start
+    backlog: pd.DataFrame   # poczekalnia (niezaplanowane aktywności)
+    shared: pd.DataFrame    # koszty wspólne i paliwo
+
+    @cached_property
+    def busy(self):
+        # Indeks zajętych godzin do wykrywania kolizji przy wrzucaniu na plan
+        return IntervalIndex.from_events(self.planned)
+
+
+def build_views(df):
+    individual = (df['Typ_Kosztu'] == 'Indywidualny').to_numpy()
+    planned = individual & df['Zaplanowane'].to_numpy() & df['Start'].notna().to_numpy()
+    backlog = individual & ~df['Zaplanowane'].to_numpy()
+    shared = df['Typ_Kosztu'].isin(TYPY_WSPOLNE).to_numpy()
+    return TripViews(
+        planned=df[planned].sort_values(by='Start'),
+        backlog=df[backlog],
+        shared=df[shared],
+    )
+
+
+def load_trip(snapshot_content, journal_content):
+    df = parse_data_csv(snapshot_content) if snapshot_content else empty_frame()
+    return apply_ops(df, parse_journal(journal_content))